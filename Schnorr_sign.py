@@ -1,8 +1,145 @@
-from pseudorandom_generator import pseudorandom_generator
-from hash_Streebog import streebog_hash
+import os
+
+from pseudorandom_generator import PseudorandomGenerator
+from hash_Streebog import message_bytes, streebog_digest, streebog_digest_many
+
+# Размеры частей подписи и открытого ключа в байтах
+R_SIZE = 64
+S_SIZE = 32
+P_SIZE = 64
+SIGNATURE_SIZE = R_SIZE + S_SIZE
+
+
+class FixedBaseTable:
+    def __init__(self, base: int, modulus: int, exponent_bits: int = 256, window: int = 8):
+        """
+        Таблица для быстрого возведения фиксированного основания в степень.
+
+        Строка j содержит base^(d * 2^(window * j)) для d = 0..2^window - 1, поэтому
+        base^e вычисляется как произведение exponent_bits / window элементов таблицы
+        без возведений в квадрат.
+
+        :param base: основание
+        :param modulus: модуль
+        :param exponent_bits: максимальная длина показателя в битах
+        :param window: ширина окна в битах
+        """
+        self.modulus = modulus
+        self.exponent_bits = exponent_bits
+        self.window = window
+        self.rows = []
+        row_base = base % modulus
+        for _ in range(0, exponent_bits, window):
+            row = [1]
+            for _ in range((1 << window) - 1):
+                row.append(row[-1] * row_base % modulus)
+            self.rows.append(row)
+            row_base = row[-1] * row_base % modulus
+
+    def pow(self, exponent: int) -> int:
+        """
+        Вычисляет base^exponent mod modulus.
+
+        :param exponent: неотрицательный показатель длиной не более exponent_bits бит
+        :return: результат возведения в степень
+        """
+        if exponent.bit_length() > self.exponent_bits:
+            raise ValueError("Показатель длиннее, чем рассчитана таблица")
+        modulus = self.modulus
+        mask = (1 << self.window) - 1
+        result = 1
+        for row in self.rows:
+            digit = exponent & mask
+            if digit:
+                result = result * row[digit] % modulus
+            exponent >>= self.window
+        return result
+
+
+def multi_exponent(pairs, modulus: int, window: int = 4) -> int:
+    """
+    Одновременное возведение в степень (метод Штрауса): произведение base_i^exp_i mod modulus.
+
+    Возведения в квадрат общие для всех оснований, поэтому стоимость почти
+    не зависит от их числа, в отличие от отдельных вызовов pow.
+
+    :param pairs: последовательность пар (основание, неотрицательный показатель)
+    :param modulus: модуль
+    :param window: ширина окна в битах
+    :return: произведение степеней
+    """
+    pairs = [(base % modulus, exponent) for base, exponent in pairs if exponent]
+    if not pairs:
+        return 1
+    mask = (1 << window) - 1
+    tables = []
+    for base, _ in pairs:
+        row = [1, base]
+        for _ in range(mask - 1):
+            row.append(row[-1] * base % modulus)
+        tables.append(row)
+
+    bits = max(exponent.bit_length() for _, exponent in pairs)
+    result = 1
+    for shift in range((bits - 1) // window * window, -1, -window):
+        if result != 1:
+            for _ in range(window):
+                result = result * result % modulus
+        for row, (_, exponent) in zip(tables, pairs):
+            digit = (exponent >> shift) & mask
+            if digit:
+                result = result * row[digit] % modulus
+    return result
+
+
+def _challenge_input(R: int, P: int, message) -> bytes:
+    """Вход хэша e: hex-записи R и P (по 128 символов) и байты сообщения (см. message_bytes)."""
+    return b'%0128x%0128x' % (R, P) + message_bytes(message)
+
+
+def _verdict_key(P: int, R: int, s: int, message) -> tuple:
+    """Ключ кэша вердиктов: сообщение приводится к подписываемым байтам, как в _challenge_input."""
+    return P, R, s, message_bytes(message)
+
+
+def signature_to_bytes(signature: tuple) -> bytes:
+    """
+    Кодирует подпись (R, s) в SIGNATURE_SIZE байт (R и s старшим байтом вперёд).
+
+    :param signature: кортеж (R, s)
+    :return: байтовое представление подписи
+    """
+    R, s = signature
+    return R.to_bytes(R_SIZE, 'big') + s.to_bytes(S_SIZE, 'big')
+
+
+def signature_from_bytes(data) -> tuple:
+    """
+    Декодирует подпись из SIGNATURE_SIZE байт.
+
+    :param data: bytes-подобный объект
+    :return: кортеж (R, s)
+    """
+    return int.from_bytes(data[:R_SIZE], 'big'), int.from_bytes(data[R_SIZE:SIGNATURE_SIZE], 'big')
 
 
 class SchnorrSignature:
+    # Параметры схемы Шнорра
+    p = int(
+        'EE8172AE8996608FB69359B89EB82A69854510E2977A4D63BC97322CE5DC3386EA0A12B343E9190F23177539845839786BB0C345D165976EF2195EC9B1C379E3', 16)
+    q = int('98915E7EC8265EDFCDA31E88F24809DDB064BDC7285DD50D7289F0AC6F49DD2D', 16)
+    g = int('9E96031500C8774A869582D4AFDE2127AFAD2538B4B6270A6F7C8837B50D50F206755984A49E509304D648BE2AB5AAB18EBE2CD46AC3D8495B142AA6CE23E21C', 16)
+    # Кофактор (p - 1) / q: возведение в эту степень убирает компоненты вне подгруппы порядка q
+    cofactor = (p - 1) // q
+
+    # Таблица степеней g строится при первом использовании и общая для всех объектов
+    _g_table = None
+    # Таблицы степеней открытых ключей, добавленные через precompute_public_key
+    # (словарь или LRUCache, см. set_key_table_cache)
+    _key_tables = {}
+    # Кэш вердиктов проверки подписей (LRUCache или None, см. set_verdict_cache)
+    _verdict_cache = None
+
     def __init__(self, seed: str):
         """
         Инициализация объекта подписи Шнорра с использованием заданного сида.
@@ -10,18 +147,110 @@ class SchnorrSignature:
         :param seed: строка-сид
         """
         self.seed = seed
-        self._prng_counter = 0
-
-        # Параметры схемы Шнорра
-        self.p = int(
-            'EE8172AE8996608FB69359B89EB82A69854510E2977A4D63BC97322CE5DC3386EA0A12B343E9190F23177539845839786BB0C345D165976EF2195EC9B1C379E3', 16)
-        self.q = int('98915E7EC8265EDFCDA31E88F24809DDB064BDC7285DD50D7289F0AC6F49DD2D', 16)
-        self.g = int('9E96031500C8774A869582D4AFDE2127AFAD2538B4B6270A6F7C8837B50D50F206755984A49E509304D648BE2AB5AAB18EBE2CD46AC3D8495B142AA6CE23E21C', 16)
+        self._prng = PseudorandomGenerator(seed, return_decimal=True)
 
         # Генерация секретного ключа
         self.x = self._next_prng() % self.q
         # Вычисление открытого ключа
-        self.P = pow(self.g, self.x, self.p)
+        self.P = self.g_pow(self.x)
+
+    @classmethod
+    def from_public_key(cls, P: int) -> 'SchnorrSignature':
+        """
+        Создаёт объект только для проверки подписей по открытому ключу.
+
+        :param P: открытый ключ g^x mod p
+        :return: объект SchnorrSignature без секретного ключа (sign недоступен)
+        """
+        verifier = cls.__new__(cls)
+        verifier.seed = None
+        verifier._prng = None
+        verifier.x = None
+        verifier.P = P
+        return verifier
+
+    @classmethod
+    def g_pow(cls, exponent: int) -> int:
+        """
+        Вычисляет g^exponent mod p по общей таблице фиксированного основания.
+
+        :param exponent: показатель (приводится по модулю q, так как порядок g равен q)
+        :return: g^exponent mod p
+        """
+        if cls._g_table is None:
+            cls._g_table = FixedBaseTable(cls.g, cls.p, cls.q.bit_length())
+        return cls._g_table.pow(exponent % cls.q)
+
+    @classmethod
+    def key_pow(cls, P: int, exponent: int) -> int:
+        """
+        Вычисляет P^exponent mod p, используя таблицу ключа, если она построена.
+
+        :param P: открытый ключ
+        :param exponent: показатель, меньший q
+        :return: P^exponent mod p
+        """
+        table = cls._key_tables.get(P)
+        if table is not None:
+            return table.pow(exponent)
+        return pow(P, exponent, cls.p)
+
+    @classmethod
+    def precompute_public_key(cls, P: int) -> bool:
+        """
+        Строит таблицу фиксированного основания для часто используемого открытого ключа.
+
+        Таблица применима только к ключам из подгруппы порядка q, где показатель
+        можно приводить по модулю q; для остальных ключей она не строится.
+
+        :param P: открытый ключ
+        :return: True, если таблица построена (или уже была)
+        """
+        if P not in cls._key_tables:
+            if not 0 < P < cls.p or pow(P, cls.q, cls.p) != 1:
+                return False
+            cls._key_tables[P] = FixedBaseTable(P, cls.p, cls.q.bit_length())
+        return True
+
+    @classmethod
+    def set_key_table_cache(cls, cache) -> None:
+        """
+        Ограничивает число хранимых таблиц открытых ключей.
+
+        По умолчанию таблицы из precompute_public_key хранятся без ограничения;
+        с LRUCache давно не использованные таблицы вытесняются. Уже построенные
+        таблицы переносятся в новый кэш.
+
+        :param cache: объект LRUCache или None (вернуть неограниченный словарь)
+        """
+        tables = cls._key_tables
+        cls._key_tables = {} if cache is None else cache
+        for P, table in list(tables.items()):
+            cls._key_tables[P] = table
+
+    @classmethod
+    def set_verdict_cache(cls, cache) -> None:
+        """
+        Включает (LRUCache) или выключает (None) кэш вердиктов verify и verify_batch.
+
+        Ключ записи — (P, R, s, байты сообщения), поэтому повторная проверка той же
+        подписи (например, при повторной проверке блоков) не требует возведений в степень.
+
+        :param cache: объект LRUCache или None
+        """
+        cls._verdict_cache = cache
+
+    @classmethod
+    def challenge(cls, R: int, P: int, message) -> int:
+        """
+        Вычисляет e = H(R ∥ P ∥ message) mod q.
+
+        :param R: первая часть подписи
+        :param P: открытый ключ
+        :param message: строка сообщения или байты транзакции (хэшируется их hex-запись)
+        :return: значение e
+        """
+        return int.from_bytes(streebog_digest(_challenge_input(R, P, message)), 'big') % cls.q
 
     def _next_prng(self) -> int:
         """
@@ -29,27 +258,21 @@ class SchnorrSignature:
 
         :return: следующее псевдослучайное число в десятичном виде
         """
-        self._prng_counter += 1
-        vals = pseudorandom_generator(self.seed, count=self._prng_counter, return_decimal=True)
-        return vals[-1]
+        return self._prng.next()
 
     def sign(self, message: str) -> tuple:
         """
         Подписывает сообщение с использованием схемы Шнорра.
 
-        :param message: строка сообщения, которое нужно подписать
+        :param message: строка сообщения или байты транзакции (подписывается их hex-запись)
         :return: кортеж (R, s), представляющий цифровую подпись
         """
         # Генерация nonce
         r = self._next_prng() % self.q
-        R = pow(self.g, r, self.p)
+        R = self.g_pow(r)
 
         # Хэширование R, P и сообщения
-        R_hex = format(R, '0128x')
-        P_hex = format(self.P, '0128x')
-        h_input = R_hex + P_hex + message
-        e_hex = streebog_hash(h_input, is_hex=False)
-        e = int(e_hex, 16) % self.q
+        e = self.challenge(R, self.P, message)
 
         # Вычисление подписи
         s = (r + e * self.x) % self.q
@@ -60,25 +283,108 @@ class SchnorrSignature:
         """
         Проверяет цифровую подпись для заданного сообщения.
 
-        :param message: строка сообщения, для которого проверяется подпись
+        Проверяется равенство (g^s)^h = (R * P^e)^h, где h — кофактор (p - 1) / q.
+        Для честных подписей оно равносильно g^s = R * P^e, а компоненты R вне
+        подгруппы порядка q не влияют на результат — так же, как в verify_batch,
+        поэтому обе проверки дают одинаковый ответ.
+
+        :param message: строка сообщения или байты транзакции (см. sign)
         :param signature: кортеж (R, s), представляющий цифровую подпись
         :return: True, если подпись корректна, иначе False
         """
         R, s = signature
+        cache = self._verdict_cache
+        if cache is not None:
+            key = _verdict_key(self.P, R, s, message)
+            verdict = cache.get(key)
+            if verdict is not None:
+                return verdict
 
         # Пересчёт хэша e
-        R_hex = format(R, '0128x')
-        P_hex = format(self.P, '0128x')
-        h_input = R_hex + P_hex + message
-        e_hex = streebog_hash(h_input, is_hex=False)
-        e = int(e_hex, 16) % self.q
-
-        # Проверка корректности подписи
-        left = pow(self.g, s, self.p)
-        right = (R * pow(self.P, e, self.p)) % self.p
+        e = self.challenge(R, self.P, message)
+
+        # Проверка корректности подписи; g лежит в подгруппе, поэтому (g^s)^h = g^(s * h mod q)
+        left = self.g_pow(s * self.cofactor % self.q)
+        right = pow(R * self.key_pow(self.P, e) % self.p, self.cofactor, self.p)
+        if cache is not None:
+            cache.put(key, left == right)
         return left == right
 
 
+def verify_batch(messages, signatures, public_keys) -> bool:
+    """
+    Пакетная проверка подписей Шнорра случайной линейной комбинацией.
+
+    Вместо n проверок g^s_i = R_i * P_i^e_i проверяется одно равенство
+    g^(sum a_i s_i) = prod R_i^a_i * prod P^(sum a_i e_i) со случайными 128-битными a_i:
+    степени g берутся из таблицы, R_i возводятся в степень одним multi_exponent,
+    а показатели одного ключа складываются, так что на каждый ключ нужна одна степень.
+    Хэши e_i считаются пакетно через streebog_digest_many.
+
+    Обе части равенства, как и в SchnorrSignature.verify, возводятся в степень
+    кофактора h = (p - 1) / q. Это убирает компоненты R_i вне подгруппы порядка q
+    (в том числе малых порядков 2, 17 и 271) ровно так же, как в одиночной проверке,
+    а в подгруппе простого порядка q пакет с неверной подписью проходит лишь при
+    случайном совпадении a_i (вероятность не больше 2^-127). Поэтому после успешной
+    проверки пакета все его подписи запоминаются в кэше вердиктов (set_verdict_cache)
+    как корректные, а уже проверенные подписи в пакет не входят.
+
+    Ключи вне подгруппы порядка q и R вне диапазона 0 < R < p проверяются по
+    отдельности.
+
+    :param messages: строки сообщений или байты транзакций (см. SchnorrSignature.sign)
+    :param signatures: подписи (R, s)
+    :param public_keys: открытые ключи P
+    :return: True, если все подписи корректны
+    """
+    if not len(messages) == len(signatures) == len(public_keys):
+        raise ValueError("Число сообщений, подписей и ключей должно совпадать")
+    p, q = SchnorrSignature.p, SchnorrSignature.q
+    cache = SchnorrSignature._verdict_cache
+
+    subgroup_keys = {}
+    batched = []
+    for message, (R, s), P in zip(messages, signatures, public_keys):
+        if cache is not None:
+            verdict = cache.get(_verdict_key(P, R, s, message))
+            if verdict is not None:
+                if not verdict:
+                    return False
+                continue
+        if P not in subgroup_keys:
+            subgroup_keys[P] = P in SchnorrSignature._key_tables or (0 < P < p and pow(P, q, p) == 1)
+        if not subgroup_keys[P] or not 0 < R < p:
+            if not SchnorrSignature.from_public_key(P).verify(message, (R, s)):
+                return False
+            continue
+        batched.append((message, R, s, P))
+
+    # Хэши e_i вычисляются одним пакетом (входы одинаковой длины группируются)
+    challenges = streebog_digest_many([_challenge_input(R, P, message) for message, R, _, P in batched],
+                                      cached=False)
+    s_total = 0
+    key_exponents = {}
+    r_pairs = []
+    for (_, R, s, P), digest in zip(batched, challenges):
+        e = int.from_bytes(digest, 'big') % q
+        a = int.from_bytes(os.urandom(16), 'big') | 1
+        s_total += a * s
+        key_exponents[P] = key_exponents.get(P, 0) + a * e
+        r_pairs.append((R, a))
+
+    h = SchnorrSignature.cofactor
+    left = SchnorrSignature.g_pow(s_total * h % q)
+    right = multi_exponent(r_pairs, p)
+    for P, exponent in key_exponents.items():
+        right = right * SchnorrSignature.key_pow(P, exponent % q) % p
+    if left != pow(right, h, p):
+        return False
+    if cache is not None:
+        for message, R, s, P in batched:
+            cache.put(_verdict_key(P, R, s, message), True)
+    return True
+
+
 if __name__ == "__main__":
     signer = SchnorrSignature("Glukhov Alexander")
     msg = "Glukhov Alexander"
@@ -0,0 +1,227 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+from block import HEADER_SIZE
+from hash_Streebog import (StageProfiler, set_stage_profiler, streebog_digest, streebog_hash,
+                           streebog_hash_many, streebog_hash_reference)
+from merkle_tree import MerkleTree
+from miner import Miner
+from pseudorandom_generator import pseudorandom_generator
+from Schnorr_sign import SchnorrSignature, verify_batch
+
+SEED = "Glukhov Alexander"
+
+
+def _percentile(sorted_samples, fraction):
+    """Перцентиль по отсортированной выборке (ближайший ранг)."""
+    index = min(len(sorted_samples) - 1, max(0, round(fraction * len(sorted_samples)) - 1))
+    return sorted_samples[index]
+
+
+def measure(func, repeat, items=1):
+    """
+    Замеряет каждый из repeat вызовов func и сводит задержки и пропускную способность.
+
+    :param func: Функция без аргументов.
+    :param repeat: Число вызовов.
+    :param items: Сколько элементов обрабатывает один вызов (для пропускной способности).
+    :return: Словарь с числом вызовов, суммарным временем, операциями в секунду и перцентилями (мкс).
+    """
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    total = sum(samples)
+    samples.sort()
+    return {
+        'calls': repeat,
+        'items_per_call': items,
+        'total_s': total,
+        'ops_per_s': repeat * items / total if total > 0 else 0.0,
+        'mean_us': total / repeat * 1e6,
+        'p50_us': _percentile(samples, 0.50) * 1e6,
+        'p90_us': _percentile(samples, 0.90) * 1e6,
+        'p99_us': _percentile(samples, 0.99) * 1e6,
+    }
+
+
+def bench_hash(sizes, repeat):
+    """Хэширование одного сообщения: табличная реализация на bytes и hex, эталонная — на малых размерах."""
+    results = {}
+    for size in sizes:
+        data = os.urandom(size)
+        message = data.hex()
+        entry = {
+            'streebog_digest': measure(lambda: streebog_digest(data), repeat),
+            'streebog_hash': measure(lambda: streebog_hash(message, is_hex=True), repeat),
+        }
+        entry['streebog_digest']['mb_per_s'] = entry['streebog_digest']['ops_per_s'] * size / 1e6
+        if size <= 64:
+            entry['streebog_hash_reference'] = measure(lambda: streebog_hash_reference(message, is_hex=True), 2)
+        results[str(size)] = entry
+    return results
+
+
+def bench_hash_many(count, repeat):
+    """Пакетное хэширование заголовков блока в сравнении с поочерёдным."""
+    messages = [os.urandom(HEADER_SIZE).hex() for _ in range(count)]
+    if streebog_hash_many(messages, is_hex=True) != [streebog_hash(m, is_hex=True) for m in messages]:
+        raise AssertionError("Пакетный и поочерёдный хэши не совпадают")
+    return {
+        'count': count,
+        'streebog_hash_many': measure(lambda: streebog_hash_many(messages, is_hex=True), repeat, count),
+        'streebog_hash': measure(lambda: [streebog_hash(m, is_hex=True) for m in messages], repeat, count),
+    }
+
+
+def bench_prng(counts, repeat):
+    """pseudorandom_generator при растущем числе значений."""
+    return {str(count): measure(lambda: pseudorandom_generator(SEED, count), repeat, count) for count in counts}
+
+
+def bench_schnorr(repeat, batch_size):
+    """Подпись, проверка и пакетная проверка подписей Шнорра."""
+    signer = SchnorrSignature(SEED)
+    messages = [os.urandom(200).hex() for _ in range(batch_size)]
+    signatures = [signer.sign(message) for message in messages]
+    keys = [signer.P] * batch_size
+    message = messages[0]
+    return {
+        'sign': measure(lambda: signer.sign(message), repeat),
+        'verify': measure(lambda: signer.verify(message, signatures[0]), repeat),
+        'verify_batch': measure(lambda: verify_batch(messages, signatures, keys), max(1, repeat // 10), batch_size),
+    }
+
+
+def bench_merkle(leaf_counts, repeat):
+    """Построение корня Меркла для N транзакций и дописывание листа."""
+    results = {}
+    for count in leaf_counts:
+        transactions = [os.urandom(200).hex() for _ in range(count)]
+        tree = MerkleTree(transactions)
+        results[str(count)] = {
+            'build': measure(lambda: MerkleTree(transactions).root, repeat, count),
+            'append': measure(lambda: tree.append(transactions[0]), repeat),
+        }
+    return results
+
+
+def bench_mining(hashes, workers):
+    """Скорость перебора nonce (цель 0 недостижима, поэтому перебирается ровно hashes значений)."""
+    prefix = os.urandom(HEADER_SIZE - 4)
+    results = {}
+    for worker_count in sorted({1, workers}):
+        result = Miner(target=0, workers=worker_count).mine(prefix, 0, hashes)
+        results[str(worker_count)] = {'hashes': result.hashes, 'elapsed_s': result.elapsed,
+                                      'hashes_per_s': result.hash_rate}
+    return results
+
+
+def profile_hash_stages(size=64):
+    """Время этапов хэширования для табличной и эталонной реализаций (см. StageProfiler)."""
+    message = os.urandom(size).hex()
+    stages = {}
+    for name, func in (('table', streebog_hash), ('reference', streebog_hash_reference)):
+        profiler = StageProfiler()
+        set_stage_profiler(profiler)
+        try:
+            func(message, is_hex=True)
+        finally:
+            set_stage_profiler(None)
+        stages[name] = profiler.report()
+    return stages
+
+
+def run_benchmarks(quick=False, profile=False):
+    """
+    Прогоняет все замеры.
+
+    :param quick: Уменьшенные размеры и число повторов (для быстрой проверки).
+    :param profile: Добавить замеры этапов хэширования.
+    :return: Словарь с результатами, пригодный для json.dump.
+    """
+    repeat = 5 if quick else 30
+    results = {
+        'meta': {
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'quick': quick,
+            'timestamp': time.time(),
+        },
+        'hash': bench_hash((64, 256, 1024) if quick else (64, 256, 1024, 4096, 16384), repeat),
+        'hash_many': bench_hash_many(200 if quick else 2000, 3),
+        'prng': bench_prng((10, 100) if quick else (10, 100, 1000, 5000), 3),
+        'schnorr': bench_schnorr(repeat, 50 if quick else 500),
+        'merkle': bench_merkle((16, 256) if quick else (16, 256, 4096), 3),
+        'mining': bench_mining(2000 if quick else 20000, os.cpu_count() or 1),
+    }
+    if profile:
+        results['hash_stages'] = profile_hash_stages()
+    return results
+
+
+def _flatten(results, prefix=''):
+    """Разворачивает вложенные результаты в {путь: значение} для числовых метрик."""
+    flat = {}
+    for key, value in results.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(_flatten(value, path))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = value
+    return flat
+
+
+def compare(baseline, current, threshold=0.2):
+    """
+    Сравнивает результаты с базовыми и ищет регрессии.
+
+    Учитываются метрики пропускной способности (ops_per_s, hashes_per_s, mb_per_s):
+    регрессией считается падение больше чем на threshold.
+
+    :param baseline: Базовые результаты (из JSON).
+    :param current: Текущие результаты.
+    :param threshold: Допустимое относительное падение.
+    :return: Список кортежей (метрика, базовое значение, текущее значение).
+    """
+    base_flat = _flatten({k: v for k, v in baseline.items() if k != 'meta'})
+    current_flat = _flatten({k: v for k, v in current.items() if k != 'meta'})
+    regressions = []
+    for path, base_value in base_flat.items():
+        if not path.endswith(('ops_per_s', 'hashes_per_s', 'mb_per_s')) or path not in current_flat:
+            continue
+        if base_value > 0 and current_flat[path] < base_value * (1 - threshold):
+            regressions.append((path, base_value, current_flat[path]))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Замеры производительности хэша, ГПСЧ, подписей, Меркла и майнинга")
+    parser.add_argument('--output', help="Файл для результатов в формате JSON")
+    parser.add_argument('--quick', action='store_true', help="Уменьшенные размеры и число повторов")
+    parser.add_argument('--profile', action='store_true', help="Замеры этапов хэширования (S, P, L, расписание ключей)")
+    parser.add_argument('--compare', help="JSON с базовыми результатами для поиска регрессий")
+    parser.add_argument('--threshold', type=float, default=0.2, help="Допустимое падение пропускной способности")
+    args = parser.parse_args()
+
+    results = run_benchmarks(quick=args.quick, profile=args.profile)
+    text = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare(json.load(f), results, args.threshold)
+        for path, base_value, value in regressions:
+            print(f"Регрессия {path}: {base_value:.1f} -> {value:.1f}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
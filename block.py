@@ -0,0 +1,347 @@
+import struct
+
+from hash_Streebog import streebog_digest, streebog_digest_many
+from Schnorr_sign import P_SIZE, R_SIZE, SIGNATURE_SIZE, SchnorrSignature, signature_from_bytes, signature_to_bytes
+
+# Единственное описание формата блока и транзакции: chain_storage и node берут его отсюда.
+# Все целые — старшим байтом вперёд, как подпись (signature_to_bytes) и длина кадра в node.
+
+# Заголовок блока: size (4 байта), prev_hash (32), merkle_root (32), timestamp (4), nonce (4)
+HEADER_FIELDS = (('size', 4), ('prev_hash', 32), ('merkle_root', 32), ('timestamp', 4), ('nonce', 4))
+HEADER_SIZE = sum(length for _, length in HEADER_FIELDS)
+HEADER_STRUCT = struct.Struct('>I32s32sII')
+
+# Запись транзакции: длина (4 байта), байты транзакции, подпись (R, s), открытый ключ P
+TX_LENGTH = struct.Struct('>I')
+# Запись блока: заголовок, число транзакций (4 байта) и записи транзакций
+TX_COUNT = struct.Struct('>I')
+TX_OVERHEAD = TX_LENGTH.size + SIGNATURE_SIZE + P_SIZE
+
+
+def _slice(buffer, start, end, copy):
+    """Срез буфера: копия в bytes или memoryview без копирования."""
+    view = memoryview(buffer).cast('B')[start:end]
+    return bytes(view) if copy else view
+
+
+class BlockHeader:
+    __slots__ = ('raw',)
+
+    def __init__(self, size, prev_hash, merkle_root, timestamp, nonce=0):
+        """
+        Заголовок блока в двоичном виде фиксированной длины HEADER_SIZE.
+
+        Объект хранит только 76 байт заголовка; поля разбираются при обращении.
+
+        :param size: Поле size (32-битное целое).
+        :param prev_hash: Хэш предыдущего блока (32 байта или hex-строка).
+        :param merkle_root: Корень Меркла (32 байта или hex-строка).
+        :param timestamp: Метка времени (32-битное целое).
+        :param nonce: Nonce (32-битное целое).
+        """
+        if isinstance(prev_hash, str):
+            prev_hash = bytes.fromhex(prev_hash)
+        if isinstance(merkle_root, str):
+            merkle_root = bytes.fromhex(merkle_root)
+        if len(prev_hash) != 32 or len(merkle_root) != 32:
+            raise ValueError("prev_hash и merkle_root должны занимать по 32 байта")
+        self.raw = HEADER_STRUCT.pack(size, prev_hash, merkle_root, timestamp, nonce)
+
+    @classmethod
+    def from_buffer(cls, buffer, offset=0, copy=True):
+        """
+        Читает заголовок из буфера (bytes, bytearray, memoryview, mmap).
+
+        По умолчанию 76 байт заголовка копируются один раз. При copy=False объект
+        хранит срез memoryview без копирования и удерживает буфер; изменение буфера
+        меняет заголовок, а mmap нельзя закрыть, пока такие объекты живы.
+
+        :param buffer: Буфер с заголовком.
+        :param offset: Смещение заголовка в буфере.
+        :param copy: Копировать ли байты заголовка.
+        :return: BlockHeader.
+        """
+        header = cls.__new__(cls)
+        header.raw = _slice(buffer, offset, offset + HEADER_SIZE, copy)
+        if len(header.raw) != HEADER_SIZE:
+            raise ValueError(f"Заголовок блока должен занимать {HEADER_SIZE} байт")
+        return header
+
+    @classmethod
+    def from_hex(cls, header):
+        """
+        :param header: Заголовок в hex-строке (например, MiningResult.header).
+        :return: BlockHeader.
+        """
+        return cls.from_buffer(bytes.fromhex(header))
+
+    @property
+    def size(self):
+        """Поле size (целое)."""
+        return HEADER_STRUCT.unpack(self.raw)[0]
+
+    @property
+    def prev_hash(self):
+        """Хэш предыдущего блока (32 байта)."""
+        return bytes(self.raw[4:36])
+
+    @property
+    def merkle_root(self):
+        """Корень Меркла (32 байта)."""
+        return bytes(self.raw[36:68])
+
+    @property
+    def timestamp(self):
+        """Метка времени (целое)."""
+        return HEADER_STRUCT.unpack(self.raw)[3]
+
+    @property
+    def nonce(self):
+        """Nonce (целое)."""
+        return HEADER_STRUCT.unpack(self.raw)[4]
+
+    def fields(self):
+        """
+        :return: Кортеж (size, prev_hash, merkle_root, timestamp, nonce).
+        """
+        return HEADER_STRUCT.unpack(self.raw)
+
+    def prefix(self):
+        """
+        :return: Заголовок без nonce (72 байта) — вход Miner.mine.
+        """
+        return bytes(self.raw[:HEADER_SIZE - 4])
+
+    def with_nonce(self, nonce):
+        """
+        :param nonce: Новый nonce.
+        :return: Копия заголовка с этим nonce.
+        """
+        return BlockHeader.from_buffer(self.prefix() + nonce.to_bytes(4, 'big'))
+
+    def hash(self):
+        """
+        :return: Хэш блока (32 байта), как chain_storage.block_hash.
+        """
+        return streebog_digest(self.raw)
+
+    def hex(self):
+        """Заголовок в hex-строке (как MiningResult.header)."""
+        return self.raw.hex()
+
+    def __bytes__(self):
+        return bytes(self.raw)
+
+    def __eq__(self, other):
+        return isinstance(other, BlockHeader) and self.raw == other.raw
+
+    def __hash__(self):
+        return hash(bytes(self.raw))
+
+    def __reduce__(self):
+        # Срез memoryview не сериализуется pickle: передаём копию байтов
+        return BlockHeader.from_buffer, (bytes(self.raw),)
+
+    def __repr__(self):
+        size, prev_hash, merkle_root, timestamp, nonce = self.fields()
+        return (f"BlockHeader(size={size:#010x}, prev_hash={prev_hash.hex()}, "
+                f"merkle_root={merkle_root.hex()}, timestamp={timestamp:#010x}, nonce={nonce})")
+
+
+def encode_headers(headers):
+    """
+    Упаковывает последовательность заголовков в один непрерывный буфер.
+
+    :param headers: Итерируемая последовательность BlockHeader.
+    :return: bytes длиной HEADER_SIZE * число заголовков.
+    """
+    return b''.join(header.raw for header in headers)
+
+
+class HeaderArray:
+    def __init__(self, buffer):
+        """
+        Массив заголовков поверх буфера без копирования (bytes, mmap, memoryview).
+
+        Заголовок i занимает байты [i * HEADER_SIZE, (i + 1) * HEADER_SIZE), поэтому
+        элементы — это срезы memoryview (BlockHeader.from_buffer с copy=False), а разбор
+        выполняется только для запрошенных полей. Для заголовка, который должен пережить
+        буфер, используйте BlockHeader.from_buffer(bytes(header)).
+
+        :param buffer: Буфер длиной, кратной HEADER_SIZE.
+        """
+        self.buffer = memoryview(buffer).cast('B')
+        if len(self.buffer) % HEADER_SIZE:
+            raise ValueError(f"Длина буфера должна быть кратна {HEADER_SIZE}")
+
+    def __len__(self):
+        return len(self.buffer) // HEADER_SIZE
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Индекс заголовка вне массива")
+        return BlockHeader.from_buffer(self.buffer, index * HEADER_SIZE, copy=False)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield BlockHeader.from_buffer(self.buffer, index * HEADER_SIZE, copy=False)
+
+    def fields(self):
+        """
+        Разбирает все заголовки одним проходом struct.iter_unpack.
+
+        :return: Список кортежей (size, prev_hash, merkle_root, timestamp, nonce).
+        """
+        return list(HEADER_STRUCT.iter_unpack(self.buffer))
+
+    def hashes(self):
+        """
+        Хэши всех заголовков одним пакетом streebog_digest_many.
+
+        :return: Список хэшей (32 байта) в порядке заголовков.
+        """
+        return streebog_digest_many([self.buffer[offset:offset + HEADER_SIZE]
+                                     for offset in range(0, len(self.buffer), HEADER_SIZE)])
+
+    def check_links(self):
+        """
+        Проверяет, что prev_hash каждого заголовка равен хэшу предыдущего.
+
+        :return: Индекс первого заголовка с неверной ссылкой или None.
+        """
+        hashes = self.hashes()
+        for index in range(1, len(hashes)):
+            offset = index * HEADER_SIZE + 4
+            if self.buffer[offset:offset + 32] != hashes[index - 1]:
+                return index
+        return None
+
+
+class Transaction:
+    __slots__ = ('raw',)
+
+    def __init__(self, data, signature, public_key):
+        """
+        Подписанная транзакция в двоичном виде: длина (4 байта), байты транзакции,
+        подпись (R, s) фиксированной длины SIGNATURE_SIZE и открытый ключ P (P_SIZE байт).
+
+        В этом же формате транзакции хранятся в журнале цепочки (chain_storage),
+        в мемпуле и передаются между узлами (node). Подписывается текстовая hex-запись транзакции (см. hex()).
+
+        :param data: Транзакция (байты или hex-строка).
+        :param signature: Подпись (R, s).
+        :param public_key: Открытый ключ P.
+        """
+        if isinstance(data, str):
+            data = bytes.fromhex(data)
+        self.raw = (TX_LENGTH.pack(len(data)) + bytes(data) + signature_to_bytes(signature)
+                    + public_key.to_bytes(P_SIZE, 'big'))
+
+    @classmethod
+    def from_buffer(cls, buffer, offset=0, copy=True):
+        """
+        Читает транзакцию из буфера.
+
+        По умолчанию запись копируется один раз; при copy=False объект хранит
+        срез memoryview и удерживает буфер (см. BlockHeader.from_buffer).
+
+        :param buffer: Буфер (bytes, bytearray, memoryview, mmap).
+        :param offset: Смещение записи в буфере.
+        :param copy: Копировать ли байты записи.
+        :return: Кортеж (Transaction, смещение следующей записи).
+        """
+        view = memoryview(buffer).cast('B')
+        if offset + TX_LENGTH.size > len(view):
+            raise ValueError("Запись транзакции обрезана")
+        length = TX_LENGTH.unpack_from(view, offset)[0]
+        end = offset + TX_OVERHEAD + length
+        if end > len(view):
+            raise ValueError("Запись транзакции обрезана")
+        tx = cls.__new__(cls)
+        tx.raw = _slice(view, offset, end, copy)
+        return tx, end
+
+    @property
+    def data(self):
+        """Байты транзакции."""
+        return bytes(self.raw[TX_LENGTH.size:len(self.raw) - SIGNATURE_SIZE - P_SIZE])
+
+    @property
+    def signature(self):
+        """Подпись (R, s)."""
+        start = len(self.raw) - SIGNATURE_SIZE - P_SIZE
+        return signature_from_bytes(self.raw[start:start + SIGNATURE_SIZE])
+
+    @property
+    def R(self):
+        """Первая часть подписи без разбора s."""
+        start = len(self.raw) - SIGNATURE_SIZE - P_SIZE
+        return int.from_bytes(self.raw[start:start + R_SIZE], 'big')
+
+    @property
+    def public_key(self):
+        """Открытый ключ P."""
+        return int.from_bytes(self.raw[len(self.raw) - P_SIZE:], 'big')
+
+    def hex(self):
+        """
+        :return: Hex-запись байтов транзакции — подписываемое сообщение и вход листа Меркла.
+        """
+        return self.data.hex()
+
+    def verify(self):
+        """
+        :return: True, если подпись транзакции корректна.
+        """
+        return SchnorrSignature.from_public_key(self.public_key).verify(self.data, self.signature)
+
+    def __bytes__(self):
+        return bytes(self.raw)
+
+    def __len__(self):
+        return len(self.raw)
+
+    def __eq__(self, other):
+        return isinstance(other, Transaction) and self.raw == other.raw
+
+    def __hash__(self):
+        return hash(bytes(self.raw))
+
+    def __reduce__(self):
+        return _transaction_from_bytes, (bytes(self.raw),)
+
+    def __repr__(self):
+        return f"Transaction(data={self.hex()[:16]}..., public_key={self.public_key:#x})"
+
+
+def _transaction_from_bytes(raw):
+    """Восстанавливает Transaction из байтов записи (для pickle)."""
+    return Transaction.from_buffer(raw)[0]
+
+
+def encode_transactions(transactions):
+    """
+    :param transactions: Итерируемая последовательность Transaction.
+    :return: Записи транзакций подряд в одном буфере (bytes).
+    """
+    return b''.join(tx.raw for tx in transactions)
+
+
+def decode_transactions(buffer, count=None, offset=0, copy=True):
+    """
+    Читает подряд идущие записи транзакций.
+
+    :param buffer: Буфер с записями.
+    :param count: Число транзакций (None — до конца буфера).
+    :param offset: Смещение первой записи.
+    :param copy: Копировать ли записи (см. Transaction.from_buffer).
+    :return: Кортеж (список Transaction, смещение после последней записи).
+    """
+    view = memoryview(buffer).cast('B')
+    transactions = []
+    while (count is None and offset < len(view)) or (count is not None and len(transactions) < count):
+        tx, offset = Transaction.from_buffer(view, offset, copy)
+        transactions.append(tx)
+    return transactions, offset
@@ -1,23 +1,44 @@
-from hash_Streebog import streebog_hash
-from pseudorandom_generator import pseudorandom_generator
+from block import BlockHeader
+from pseudorandom_generator import PseudorandomGenerator
 from Schnorr_sign import SchnorrSignature
+from miner import Miner
+from merkle_tree import MerkleTree
 
 SEED = "Glukhov Alexander"
 TX_HEX_LEN = 400
-# Кэш псевдослучайных чисел
-PRNG_CACHE = pseudorandom_generator(SEED, 50, return_decimal=False) # с запасом
-PRNG_INDEX = 0
+# Потоковый генератор псевдослучайных чисел; создаётся при первом обращении, а не при импорте
+_prng = None
+
+def default_prng():
+    """
+    Возвращает общий генератор псевдослучайных чисел, создавая его при первом вызове.
+
+    :return: PseudorandomGenerator, инициализированный сидом SEED.
+    """
+    global _prng
+    if _prng is None:
+        _prng = PseudorandomGenerator(SEED, return_decimal=False)
+    return _prng
 
 def next_rand():
     """
-    Возвращает следующее значение из кэша псевдослучайных чисел.
+    Возвращает следующее значение генератора псевдослучайных чисел.
 
     :return: Hex-строка следующего псевдослучайного значения.
     """
-    global PRNG_CACHE, PRNG_INDEX
-    val = PRNG_CACHE[PRNG_INDEX]
-    PRNG_INDEX += 1
-    return val
+    return default_prng().next()
+
+def generate_transaction_bytes(prefix = None):
+    """
+    Генерирует транзакцию длиной TX_HEX_LEN // 2 байт. Может включать префикс (например, имя).
+
+    :param prefix: Строка-префикс, которая будет добавлена в начало транзакции.
+    :return: Транзакция в виде bytes.
+    """
+    tx = bytearray(prefix.encode('utf-8') if prefix else b'')
+    while len(tx) < TX_HEX_LEN // 2:
+        tx += default_prng().next_bytes()
+    return bytes(tx[:TX_HEX_LEN // 2])
 
 def generate_transaction(prefix = None):
     """
@@ -26,61 +47,45 @@ def generate_transaction(prefix = None):
     :param prefix: Строка-префикс, которая будет добавлена в начало транзакции.
     :return: Транзакция в виде hex-строки длиной TX_HEX_LEN символов.
     """
-    tx = ""
-    if prefix:
-        tx += prefix.encode('utf-8').hex()
-    while len(tx) < TX_HEX_LEN:
-        tx += next_rand()
-    return tx[:TX_HEX_LEN]
-
-def sum_of_hashes(h1, h2):
-    """
-    Складывает два хэша по модулю 2^256.
+    return generate_transaction_bytes(prefix).hex()
 
-    :param h1: Первый хэш в hex-строке.
-    :param h2: Второй хэш в hex-строке.
-    :return: Сумма хэшей по модулю 2^256 в hex-строке (длина 64 символа).
-    """
-    return hex((int(h1, 16) + int(h2, 16)) % (2**256))[2:].zfill(64)
-
-# 1. Генерация транзакций и подписей
-signer = SchnorrSignature(SEED)
-transactions = [generate_transaction(SEED)] + [generate_transaction() for _ in range(4)]
-signed = [signer.sign(tx) for tx in transactions]
-
-# 2. Построение Merkle-дерева вручную
-leaves = [streebog_hash(tx, is_hex=False) for tx in transactions]
-if len(leaves) % 2:
-    leaves.append(leaves[-1])
-
-h12 = streebog_hash(sum_of_hashes(leaves[0], leaves[1]), is_hex=True)
-h34 = streebog_hash(sum_of_hashes(leaves[2], leaves[3]), is_hex=True)
-h1234 = streebog_hash(sum_of_hashes(h12, h34), is_hex=True)
-h12345 = streebog_hash(sum_of_hashes(h1234, leaves[4]), is_hex=True)
-merkle_root = h12345
-
-# 3. Формирование заголовка блока и Proof-of-Work
-size = next_rand()[:8]
-while bin(int(size[0], 16))[2:].zfill(4)[0] == '0':
+def main():
+    """Демонстрация: подписи транзакций, дерево Меркла и поиск nonce для заголовка блока."""
+    # 1. Генерация транзакций и подписей
+    signer = SchnorrSignature(SEED)
+    transactions = [generate_transaction(SEED)] + [generate_transaction() for _ in range(4)]
+    signed = [signer.sign(tx) for tx in transactions]
+
+    # 2. Построение Merkle-дерева
+    merkle_root = MerkleTree(transactions).root
+
+    # 3. Формирование заголовка блока и Proof-of-Work
     size = next_rand()[:8]
+    while bin(int(size[0], 16))[2:].zfill(4)[0] == '0':
+        size = next_rand()[:8]
+
+    prev_hash = next_rand()
+    timestamp = format(11, '02x') + format(31, '02x') + format(5, '02x') + format(25, '02x')
 
-prev_hash = next_rand()
-timestamp = format(11, '02x') + format(31, '02x') + format(5, '02x') + format(25, '02x')
-
-# Перебор nonce для нахождения подходящего блока ("00000")
-for nonce in range(1, 100):
-    block_header = f"{size}{prev_hash}{merkle_root}{timestamp}{format(nonce, '08x')}"
-    print(f"nonce = {nonce}\nHeader right now: {block_header}")
-    h = streebog_hash(block_header, is_hex=True)
-    bin_h = bin(int(h,16))[2:].zfill(len(h) * 4)
-    print(f'hash: {h}\n')
-    if bin_h[:5] == ("00000"):
-        print(f"PoW!!! Nonce: {format(nonce, '08x')} (dec: {nonce})")
+    # Перебор nonce для нахождения подходящего блока (первые 5 бит хэша — ноль).
+    # Для сложности в 5 бит хватает одного процесса; пул нужен при большей сложности
+    miner = Miner(difficulty_bits=5, workers=1)
+    header = BlockHeader(int(size, 16), prev_hash, merkle_root, int(timestamp, 16))
+    result = miner.mine(header.prefix(), start=1)
+    if result.nonce is not None:
+        block_header = result.header
+        h = result.hash
+        bin_h = bin(int(h, 16))[2:].zfill(len(h) * 4)
+        print(f"PoW!!! Nonce: {format(result.nonce, '08x')} (dec: {result.nonce})")
         print("Block header:", block_header)
         print("Hash:", h)
         print("Bin(Первые пять бит - ноль:):", bin_h)
-        break
+        print(f"Перебрано {result.hashes} nonce ({result.hash_rate:.0f} H/s)")
+
+    print("Merkle root:", merkle_root)
+    print("Transactions:", transactions)
+    print("Signatures:", signed)
+
 
-print("Merkle root:", merkle_root)
-print("Transactions:", transactions)
-print("Signatures:", signed)
+if __name__ == "__main__":
+    main()
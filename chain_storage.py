@@ -0,0 +1,347 @@
+import mmap
+import os
+import struct
+from collections import namedtuple
+
+from block import (HEADER_FIELDS, HEADER_SIZE, TX_COUNT, TX_LENGTH, TX_OVERHEAD, BlockHeader, decode_transactions,
+                   encode_transactions)
+from hash_Streebog import as_bytes, streebog_digest
+
+# Версия 2: длины и число транзакций в журнале записаны старшим байтом вперёд
+_INDEX_MAGIC = b'CHAINIX2'
+_HASHES_MAGIC = b'CHAINHSH'
+_INDEX_HEADER = struct.Struct('<8sQ')  # magic, число блоков
+_INDEX_ENTRY = struct.Struct('<Q32s')  # смещение записи в журнале, хэш блока
+_HASHES_HEADER = struct.Struct('<8sQ')  # magic, ёмкость таблицы
+_SLOT = struct.Struct('<Q')  # высота + 1 (0 — пустая ячейка)
+
+# header — BlockHeader, transactions — список Transaction
+StoredBlock = namedtuple('StoredBlock', ['height', 'hash', 'header', 'transactions'])
+
+
+def _as_header(header):
+    """Приводит заголовок (BlockHeader, байты или hex-строку) к BlockHeader."""
+    if isinstance(header, BlockHeader):
+        return header
+    return BlockHeader.from_buffer(as_bytes(header))
+
+
+def parse_header(header):
+    """
+    Разбирает заголовок блока на поля.
+
+    :param header: Заголовок блока: BlockHeader, HEADER_SIZE байт или hex-строка.
+    :return: Словарь {имя поля: bytes}.
+    """
+    raw = bytes(_as_header(header))
+    fields = {}
+    offset = 0
+    for name, length in HEADER_FIELDS:
+        fields[name] = raw[offset:offset + length]
+        offset += length
+    return fields
+
+
+def encode_block(header, transactions=()):
+    """
+    Кодирует блок в формат записи журнала: заголовок, число транзакций и записи
+    транзакций (Transaction: длина, байты, подпись (R, s) и открытый ключ P).
+
+    :param header: Заголовок блока (BlockHeader, байты или hex-строка).
+    :param transactions: Последовательность Transaction.
+    :return: Запись блока (bytes).
+    """
+    return b''.join((bytes(_as_header(header)), TX_COUNT.pack(len(transactions)),
+                     encode_transactions(transactions)))
+
+
+def decode_block(record, height=None, digest=None):
+    """
+    Разбирает запись блока, созданную encode_block.
+
+    :param record: Запись блока (bytes-подобный объект).
+    :param height: Высота блока, если она известна.
+    :param digest: Хэш блока; если не задан, вычисляется по заголовку.
+    :return: StoredBlock с BlockHeader и списком Transaction.
+    """
+    record = memoryview(record).cast('B')
+    if len(record) < HEADER_SIZE + TX_COUNT.size:
+        raise ValueError("Запись блока короче заголовка")
+    header = BlockHeader.from_buffer(record)
+    tx_count = TX_COUNT.unpack_from(record, HEADER_SIZE)[0]
+    transactions, _ = decode_transactions(record, tx_count, HEADER_SIZE + TX_COUNT.size)
+    if digest is None:
+        digest = header.hash()
+    return StoredBlock(height, digest, header, transactions)
+
+
+def block_hash(header):
+    """
+    Хэш блока — хэш его заголовка.
+
+    :param header: Заголовок блока: BlockHeader, байты или hex-строка.
+    :return: Хэш (32 байта).
+    """
+    if isinstance(header, BlockHeader):
+        return header.hash()
+    return streebog_digest(as_bytes(header))
+
+
+class Chain:
+    def __init__(self, path):
+        """
+        Хранилище цепочки блоков в каталоге path.
+
+        blocks.dat — журнал только для дозаписи: заголовок блока фиксированной
+        длины, число транзакций и для каждой транзакции её длина, байты, подпись
+        (R, s) и открытый ключ P. index.dat — отображаемый в память массив
+        «высота → (смещение, хэш)», hashes.dat — отображаемая в память хэш-таблица
+        с открытой адресацией «хэш → высота». Открытие существующей цепочки не
+        перечитывает журнал: достаточно отобразить оба индекса.
+
+        :param path: Путь к каталогу цепочки (создаётся при необходимости).
+        """
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self._log = open(os.path.join(path, 'blocks.dat'), 'a+b')
+        self._index_file = self._open_mapped('index.dat', _INDEX_HEADER, _INDEX_MAGIC, _INDEX_HEADER.size + _INDEX_ENTRY.size * 1024, 0)
+        self._hashes_file = self._open_mapped('hashes.dat', _HASHES_HEADER, _HASHES_MAGIC, _HASHES_HEADER.size + _SLOT.size * 2048, 2048)
+        self._index = mmap.mmap(self._index_file.fileno(), 0)
+        self._hashes = mmap.mmap(self._hashes_file.fileno(), 0)
+        self._count = _INDEX_HEADER.unpack_from(self._index)[1]
+        self._capacity = _HASHES_HEADER.unpack_from(self._hashes)[1]
+        self._recover_log()
+        self._recover_hashes()
+
+    def _open_mapped(self, name, header, magic, initial_size, value):
+        """Открывает файл индекса, создавая его с заголовком (magic, value) при первом запуске."""
+        file_path = os.path.join(self.path, name)
+        if not os.path.exists(file_path) or os.path.getsize(file_path) == 0:
+            with open(file_path, 'wb') as f:
+                f.write(header.pack(magic, value))
+                f.truncate(initial_size)
+        f = open(file_path, 'r+b')
+        if f.read(8) != magic:
+            f.close()
+            raise ValueError(f"Файл {file_path} не является индексом цепочки")
+        return f
+
+    def _recover_log(self):
+        """Отбрасывает хвост журнала, записанный без индекса (например, при сбое во время append)."""
+        self._log.seek(0, os.SEEK_END)
+        self._log_size = self._log.tell()
+        if self._count:
+            last_offset = self._entry(self._count - 1)[0]
+            expected_end = last_offset + self._record_length(last_offset)
+        else:
+            expected_end = 0
+        if self._log_size > expected_end:
+            self._log.truncate(expected_end)
+            self._log_size = expected_end
+        elif self._log_size < expected_end:
+            raise ValueError("Журнал блоков короче, чем указано в индексе")
+
+    def _recover_hashes(self):
+        """
+        Перестраивает хэш-таблицу по index.dat, если в ней не находится вершина цепочки.
+
+        Так восстанавливается таблица, оставшаяся пустой или заполненной частично
+        после сбоя во время перестройки (вершина вставляется в таблицу последней).
+        """
+        tmp_path = os.path.join(self.path, 'hashes.dat.tmp')
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        if not self._count:
+            return
+        capacity = self._capacity
+        valid = capacity > 0 and capacity & (capacity - 1) == 0 and self._count * 2 <= capacity
+        if valid and len(self._hashes) >= _HASHES_HEADER.size + capacity * _SLOT.size:
+            if self.height_of(self.tip) == self._count - 1:
+                return
+        capacity = 2048
+        while self._count * 2 > capacity:
+            capacity *= 2
+        self._rebuild_hashes(capacity, self._count)
+
+    def _record_length(self, offset):
+        """Длина записи блока в журнале, начинающейся со смещения offset."""
+        position = offset + HEADER_SIZE
+        tx_count = TX_COUNT.unpack(self._read(position, TX_COUNT.size))[0]
+        position += TX_COUNT.size
+        for _ in range(tx_count):
+            tx_len = TX_LENGTH.unpack(self._read(position, TX_LENGTH.size))[0]
+            position += TX_OVERHEAD + tx_len
+        return position - offset
+
+    def _read(self, offset, length):
+        self._log.seek(offset)
+        return self._log.read(length)
+
+    def _entry(self, height):
+        """Возвращает (смещение, хэш в байтах) блока на высоте height."""
+        return _INDEX_ENTRY.unpack_from(self._index, _INDEX_HEADER.size + height * _INDEX_ENTRY.size)
+
+    def __len__(self):
+        return self._count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def tip(self):
+        """Хэш последнего блока (32 байта; None для пустой цепочки)."""
+        return self._entry(self._count - 1)[1] if self._count else None
+
+    def append(self, header, transactions=()):
+        """
+        Дописывает блок в конец цепочки.
+
+        :param header: Заголовок блока (BlockHeader, байты или hex-строка).
+        :param transactions: Последовательность Transaction.
+        :return: Высота добавленного блока.
+        """
+        header = _as_header(header)
+        if self._count and header.prev_hash != self.tip:
+            raise ValueError("prev_hash блока не совпадает с хэшем вершины цепочки")
+        digest = header.hash()
+        if self.height_of(digest) is not None:
+            raise ValueError("Блок с таким хэшем уже есть в цепочке")
+
+        record = encode_block(header, transactions)
+
+        # Сначала журнал, затем индекс: незаиндексированный хвост отбрасывается при открытии
+        offset = self._log_size
+        self._log.write(record)
+        self._log.flush()
+        self._log_size += len(record)
+
+        height = self._count
+        self._write_index_entry(height, offset, digest)
+        self._insert_hash(digest, height)
+        self._count += 1
+        _INDEX_HEADER.pack_into(self._index, 0, _INDEX_MAGIC, self._count)
+        return height
+
+    def _write_index_entry(self, height, offset, digest):
+        """Записывает элемент индекса высот, увеличивая файл вдвое при нехватке места."""
+        position = _INDEX_HEADER.size + height * _INDEX_ENTRY.size
+        if position + _INDEX_ENTRY.size > len(self._index):
+            new_size = _INDEX_HEADER.size + (len(self._index) - _INDEX_HEADER.size) * 2
+            self._index.close()
+            self._index_file.truncate(new_size)
+            self._index = mmap.mmap(self._index_file.fileno(), 0)
+        _INDEX_ENTRY.pack_into(self._index, position, offset, digest)
+
+    def _slot_of(self, digest):
+        """Номер ячейки хэш-таблицы, в которой находится digest или куда его нужно вставить."""
+        mask = self._capacity - 1
+        slot = int.from_bytes(digest[:8], 'little') & mask
+        while True:
+            value = _SLOT.unpack_from(self._hashes, _HASHES_HEADER.size + slot * _SLOT.size)[0]
+            if value == 0 or self._entry(value - 1)[1] == digest:
+                return slot, value
+            slot = (slot + 1) & mask
+
+    def _insert_hash(self, digest, height):
+        """Добавляет хэш в таблицу; при заполнении больше чем наполовину таблица перестраивается."""
+        if (self._count + 1) * 2 > self._capacity:
+            self._rebuild_hashes(self._capacity * 2, height)
+        slot, _ = self._slot_of(digest)
+        _SLOT.pack_into(self._hashes, _HASHES_HEADER.size + slot * _SLOT.size, height + 1)
+
+    def _rebuild_hashes(self, capacity, count):
+        """
+        Перестраивает хэш-таблицу заданной ёмкости по первым count элементам индекса высот.
+
+        Новая таблица строится во временном файле и заменяет hashes.dat через
+        os.replace, поэтому при сбое на диске остаётся либо старая, либо новая
+        заполненная таблица.
+        """
+        file_path = os.path.join(self.path, 'hashes.dat')
+        tmp_path = file_path + '.tmp'
+        mask = capacity - 1
+        with open(tmp_path, 'w+b') as f:
+            f.truncate(_HASHES_HEADER.size + capacity * _SLOT.size)
+            with mmap.mmap(f.fileno(), 0) as table:
+                _HASHES_HEADER.pack_into(table, 0, _HASHES_MAGIC, capacity)
+                for height in range(count):
+                    slot = int.from_bytes(self._entry(height)[1][:8], 'little') & mask
+                    while _SLOT.unpack_from(table, _HASHES_HEADER.size + slot * _SLOT.size)[0]:
+                        slot = (slot + 1) & mask
+                    _SLOT.pack_into(table, _HASHES_HEADER.size + slot * _SLOT.size, height + 1)
+                table.flush()
+            os.fsync(f.fileno())
+        self._hashes.close()
+        self._hashes_file.close()
+        os.replace(tmp_path, file_path)
+        self._hashes_file = open(file_path, 'r+b')
+        self._hashes = mmap.mmap(self._hashes_file.fileno(), 0)
+        self._capacity = capacity
+
+    def height_of(self, digest):
+        """
+        Ищет высоту блока по его хэшу за O(1).
+
+        :param digest: Хэш блока (32 байта или hex-строка).
+        :return: Высота блока или None, если блока нет.
+        """
+        _, value = self._slot_of(as_bytes(digest))
+        # Ячейка записывается раньше счётчика блоков: после сбоя между этими записями
+        # в таблице может остаться высота незавершённого блока
+        if not value or value - 1 >= self._count:
+            return None
+        return value - 1
+
+    def block_hash(self, height):
+        """
+        :param height: Высота блока.
+        :return: Хэш блока (32 байта).
+        """
+        self._check_height(height)
+        return self._entry(height)[1]
+
+    def header(self, height):
+        """
+        :param height: Высота блока.
+        :return: Заголовок блока (BlockHeader).
+        """
+        self._check_height(height)
+        return BlockHeader.from_buffer(self._read(self._entry(height)[0], HEADER_SIZE))
+
+    def block(self, height):
+        """
+        Читает блок целиком.
+
+        :param height: Высота блока.
+        :return: StoredBlock с BlockHeader и списком Transaction.
+        """
+        self._check_height(height)
+        offset, digest = self._entry(height)
+        end = self._entry(height + 1)[0] if height + 1 < self._count else self._log_size
+        return decode_block(self._read(offset, end - offset), height, digest)
+
+    def iter_blocks(self, start=0):
+        """
+        Последовательно читает блоки начиная с высоты start.
+
+        :param start: Начальная высота.
+        :return: Генератор StoredBlock.
+        """
+        for height in range(start, self._count):
+            yield self.block(height)
+
+    def _check_height(self, height):
+        if not 0 <= height < self._count:
+            raise IndexError(f"Блока на высоте {height} нет (длина цепочки {self._count})")
+
+    def close(self):
+        """Сбрасывает индексы на диск и закрывает файлы."""
+        for mapped in (self._index, self._hashes):
+            if not mapped.closed:
+                mapped.flush()
+                mapped.close()
+        for f in (self._index_file, self._hashes_file, self._log):
+            f.close()
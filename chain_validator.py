@@ -0,0 +1,158 @@
+import os
+import sys
+import time
+from collections import deque, namedtuple
+
+from chain_storage import Chain
+from merkle_tree import MerkleTree, hash_leaves
+from miner import difficulty_to_target
+from Schnorr_sign import SchnorrSignature, verify_batch
+
+# Корень Меркла в заголовке блока без транзакций
+EMPTY_MERKLE_ROOT = bytes(32)
+
+# Итог проверки: height и reason описывают первую ошибку (None, если цепочка корректна)
+ValidationResult = namedtuple('ValidationResult', ['valid', 'height', 'reason', 'blocks', 'elapsed', 'blocks_per_second'])
+
+
+def check_block(block, target, leaves=None):
+    """
+    Проверяет независимые от соседей свойства блока: хэш, PoW, корень Меркла и подписи.
+
+    Подписи сначала проверяются пакетно через verify_batch.
+
+    :param block: StoredBlock из хранилища цепочки.
+    :param target: 256-битная цель Proof-of-Work.
+    :param leaves: Хэши листьев транзакций блока, если они уже вычислены (hash_leaves).
+    :return: Кортеж (высота, хэш заголовка, причина ошибки или None).
+    """
+    digest = block.header.hash()
+    if digest != block.hash:
+        return block.height, digest, "хэш заголовка не совпадает с хэшем в индексе"
+    if int.from_bytes(digest, 'big') >= target:
+        return block.height, digest, "хэш заголовка не удовлетворяет цели Proof-of-Work"
+
+    # Байты транзакций подписываются так же, как хэшируются листья (hex-запись)
+    messages = [tx.data for tx in block.transactions]
+    if leaves is None:
+        leaves = hash_leaves(messages)
+    expected_root = MerkleTree.from_leaves(leaves).root_digest or EMPTY_MERKLE_ROOT
+    if block.header.merkle_root != expected_root:
+        return block.height, digest, "корень Меркла не совпадает с транзакциями блока"
+
+    signatures = [tx.signature for tx in block.transactions]
+    public_keys = [tx.public_key for tx in block.transactions]
+    if verify_batch(messages, signatures, public_keys):
+        return block.height, digest, None
+    # Пакетная проверка не говорит, какая подпись неверна: ищем её по отдельности
+    for index, (tx, signature, P) in enumerate(zip(messages, signatures, public_keys)):
+        if not SchnorrSignature.from_public_key(P).verify(tx, signature):
+            return block.height, digest, f"неверная подпись транзакции {index}"
+    return block.height, digest, "неверная подпись в пакете транзакций"
+
+
+def _check_links(results, start_hash=None):
+    """
+    Проверяет ссылки prev_hash по результатам check_block, идущим в порядке высот.
+
+    :param results: Итерируемая последовательность пар (block, результат check_block).
+    :param start_hash: Хэш блока, предшествующего первому проверяемому (None — с генезиса).
+    :return: Генератор (высота, причина ошибки или None).
+    """
+    prev_hash = start_hash
+    for block, (height, digest, reason) in results:
+        if reason is None and prev_hash is not None and block.header.prev_hash != prev_hash:
+            reason = "prev_hash не совпадает с хэшем предыдущего блока"
+        yield height, reason
+        prev_hash = digest
+
+
+def _parallel_check(blocks, target, workers, max_pending):
+    """
+    Раздаёт check_block пулу процессов, держа в работе не больше max_pending блоков.
+
+    :return: Генератор пар (block, результат check_block) в исходном порядке.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        try:
+            for block in blocks:
+                if len(pending) >= max_pending:
+                    done_block, future = pending.popleft()
+                    yield done_block, future.result()
+                pending.append((block, executor.submit(check_block, block, target)))
+            while pending:
+                done_block, future = pending.popleft()
+                yield done_block, future.result()
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+
+def validate_chain(chain, difficulty_bits=None, target=None, start=0, workers=None, max_pending=None):
+    """
+    Полная проверка цепочки: ссылки prev_hash, PoW, корни Меркла и подписи транзакций.
+
+    Блоки читаются с диска генератором; хэширование и проверка подписей
+    выполняются в пуле процессов, а очередь незавершённых задач ограничена,
+    поэтому память не растёт с длиной цепочки.
+
+    :param chain: Объект Chain или путь к каталогу цепочки.
+    :param difficulty_bits: Сложность в битах (вместо target).
+    :param target: 256-битная цель Proof-of-Work.
+    :param start: Высота, с которой начинается проверка.
+    :param workers: Число процессов (по умолчанию — число ядер; 1 — без пула).
+    :param max_pending: Максимум блоков в обработке (по умолчанию 4 на процесс).
+    :return: ValidationResult с первой ошибкой и скоростью проверки.
+    """
+    if (difficulty_bits is None) == (target is None):
+        raise ValueError("Нужно указать ровно одно из: difficulty_bits или target")
+    if target is None:
+        target = difficulty_to_target(difficulty_bits)
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or workers * 4
+
+    own_chain = not isinstance(chain, Chain)
+    if own_chain:
+        chain = Chain(chain)
+    started = time.perf_counter()
+    checked = 0
+    failure = None
+    try:
+        blocks = chain.iter_blocks(start)
+        if workers == 1:
+            results = ((block, check_block(block, target)) for block in blocks)
+        else:
+            results = _parallel_check(blocks, target, workers, max_pending)
+        start_hash = chain.block_hash(start - 1) if start > 0 else None
+        for height, reason in _check_links(results, start_hash):
+            checked += 1
+            if reason is not None:
+                failure = (height, reason)
+                break
+        # Закрываем генератор, чтобы остановить пул и отменить оставшиеся задачи
+        results.close()
+    finally:
+        if own_chain:
+            chain.close()
+
+    elapsed = time.perf_counter() - started
+    blocks_per_second = checked / elapsed if elapsed > 0 else 0.0
+    if failure is None:
+        return ValidationResult(True, None, None, checked, elapsed, blocks_per_second)
+    return ValidationResult(False, failure[0], failure[1], checked, elapsed, blocks_per_second)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Использование: python chain_validator.py <каталог цепочки> [сложность в битах]")
+        sys.exit(2)
+    bits = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    result = validate_chain(sys.argv[1], difficulty_bits=bits)
+    if result.valid:
+        print(f"Цепочка корректна: {result.blocks} блоков, {result.blocks_per_second:.1f} блоков/с")
+    else:
+        print(f"Ошибка на высоте {result.height}: {result.reason}")
+        sys.exit(1)
@@ -1,9 +1,339 @@
-import numpy as np
+import struct
+import time
+
+# S-блок (таблица подстановки)
+PI = (
+    252, 238, 221, 17, 207, 110, 49, 22, 251, 196, 250, 218, 35, 197, 4, 77, 233, 119, 240, 219, 147,
+    46, 153, 186, 23, 54, 241, 187, 20, 205, 95, 193, 249, 24, 101, 90, 226, 92, 239, 33, 129, 28, 60, 66, 139, 1,
+    142, 79, 5, 132, 2, 174, 227, 106, 143, 160, 6, 11, 237, 152, 127, 212, 211, 31, 235, 52, 44, 81, 234, 200,
+    72, 171, 242, 42, 104, 162, 253, 58, 206, 204, 181, 112, 14, 86, 8, 12, 118, 18, 191, 114, 19, 71, 156, 183,
+    93, 135, 21, 161, 150, 41, 16, 123, 154, 199, 243, 145, 120, 111, 157, 158, 178, 177, 50, 117, 25, 61, 255,
+    53, 138, 126, 109, 84, 198, 128, 195, 189, 13, 87, 223, 245, 36, 169, 62, 168, 67, 201, 215, 121, 214, 246,
+    124, 34, 185, 3, 224, 15, 236, 222, 122, 148, 176, 188, 220, 232, 40, 80, 78, 51, 10, 74, 167, 151, 96, 115,
+    30, 0, 98, 68, 26, 184, 56, 130, 100, 159, 38, 65, 173, 69, 70, 146, 39, 94, 85, 47, 140, 163, 165, 125, 105,
+    213, 149, 59, 7, 88, 179, 64, 134, 172, 29, 247, 48, 55, 107, 228, 136, 217, 231, 137, 225, 27, 131, 73, 76,
+    63, 248, 254, 141, 83, 170, 144, 202, 216, 133, 97, 32, 113, 103, 164, 45, 43, 9, 91, 203, 155, 37, 208, 190,
+    229, 108, 82, 89, 166, 116, 210, 230, 244, 180, 192, 209, 102, 175, 194, 57, 75, 99, 182
+)
+
+# Начальный вектор хэша: 512 битов, чередующихся '00000001'
+INIT_VEC = [int(bit) for bit in '00000001' * 64]
+
+# Таблица перестановки байтов
+TAU = (
+    0, 8, 16, 24, 32, 40, 48, 56, 1, 9, 17, 25, 33, 41, 49, 57, 2, 10, 18, 26, 34, 42, 50, 58, 3, 11, 19, 27,
+    35, 43, 51, 59, 4, 12, 20, 28, 36, 44, 52, 60, 5, 13, 21, 29, 37, 45, 53, 61, 6, 14, 22, 30, 38, 46, 54, 62,
+    7, 15, 23, 31, 39, 47, 55, 63
+)
+
+# 12 раундовых констант в 512-битном формате
+CONSTANTS = [
+    0xb1085bda1ecadae9ebcb2f81c0657c1f2f6a76432e45d016714eb88d7585c4fc4b7ce09192676901a2422a08a460d31505767436cc744d23dd806559f2a64507,
+    0x6fa3b58aa99d2f1a4fe39d460f70b5d7f3feea720a232b9861d55e0f16b501319ab5176b12d699585cb561c2db0aa7ca55dda21bd7cbcd56e679047021b19bb7,
+    0xf574dcac2bce2fc70a39fc286a3d843506f15e5f529c1f8bf2ea7514b1297b7bd3e20fe490359eb1c1c93a376062db09c2b6f443867adb31991e96f50aba0ab2,
+    0xef1fdfb3e81566d2f948e1a05d71e4dd488e857e335c3c7d9d721cad685e353fa9d72c82ed03d675d8b71333935203be3453eaa193e837f1220cbebc84e3d12e,
+    0x4bea6bacad4747999a3f410c6ca923637f151c1f1686104a359e35d7800fffbdbfcd1747253af5a3dfff00b723271a167a56a27ea9ea63f5601758fd7c6cfe57,
+    0xae4faeae1d3ad3d96fa4c33b7a3039c02d66c4f95142a46c187f9ab49af08ec6cffaa6b71c9ab7b40af21f66c2bec6b6bf71c57236904f35fa68407a46647d6e,
+    0xf4c70e16eeaac5ec51ac86febf240954399ec6c7e6bf87c9d3473e33197a93c90992abc52d822c3706476983284a05043517454ca23c4af38886564d3a14d493,
+    0x9b1f5b424d93c9a703e7aa020c6e41414eb7f8719c36de1e89b4443b4ddbc49af4892bcb929b069069d18d2bd1a5c42f36acc2355951a8d9a47f0dd4bf02e71e,
+    0x378f5a541631229b944c9ad8ec165fde3a7d3a1b258942243cd955b7e00d0984800a440bdbb2ceb17b2b8a9aa6079c540e38dc92cb1f2a607261445183235adb,
+    0xabbedea680056f52382ae548b2e4f3f38941e71cff8a78db1fffe18a1b3361039fe76702af69334b7a1e6c303b7652f43698fad1153bb6c374b4c7fb98459ced,
+    0x7bcd9ed0efc889fb3002c6cd635afe94d8fa6bbbebab076120018021148466798a1d71efea48b9caefbacd1d7d476e98dea2594ac06fd85d6bcaa4cd81f32d1b,
+    0x378ee767f11631bad21380b00449b17acda43c32bcdf1d77f82012d430219f9b5d80ef9d1891cc86e71da4aa88e12852faf417d5d9b21b9948bc924af11bd720
+]
+
+# Матрица L-преобразования
+MATRIX_DATA = [
+    "8e20faa72ba0b470", "47107ddd9b505a38", "ad08b0e0c3282d1c", "d8045870ef14980e",
+    "6c022c38f90a4c07", "3601161cf205268d", "1b8e0b0e798c13c8", "83478b07b2468764",
+    "a011d380818e8f40", "5086e740ce47c920", "2843fd2067adea10", "14aff010bdd87508",
+    "0ad97808d06cb404", "05e23c0468365a02", "8c711e02341b2d01", "46b60f011a83988e",
+    "90dab52a387ae76f", "486dd4151c3dfdb9", "24b86a840e90f0d2", "125c354207487869",
+    "092e94218d243cba", "8a174a9ec8121e5d", "4585254f64090fa0", "accc9ca9328a8950",
+    "9d4df05d5f661451", "c0a878a0a1330aa6", "60543c50de970553", "302a1e286fc58ca7",
+    "18150f14b9ec46dd", "0c84890ad27623e0", "0642ca05693b9f70", "0321658cba93c138",
+    "86275df09ce8aaa8", "439da0784e745554", "afc0503c273aa42a", "d960281e9d1d5215",
+    "e230140fc0802984", "71180a8960409a42", "b60c05ca30204d21", "5b068c651810a89e",
+    "456c34887a3805b9", "ac361a443d1c8cd2", "561b0d22900e4669", "2b838811480723ba",
+    "9bcf4486248d9f5d", "c3e9224312c8c1a0", "effa11af0964ee50", "f97d86d98a327728",
+    "e4fa2054a80b329c", "727d102a548b194e", "39b008152acb8227", "9258048415eb419d",
+    "492c024284fbaec0", "aa16012142f35760", "550b8e9e21f7a530", "a48b474f9ef5dc18",
+    "70a6a56e2440598e", "3853dc371220a247", "1ca76e95091051ad", "0edd37c48a08a6d8",
+    "07e095624504536c", "8d70c431ac02a736", "c83862965601dd1b", "641c314b2b8ee083"
+]
+
+
+_MASK512 = (1 << 512) - 1
+_PACK_WORDS = struct.Struct('<8Q').pack
+
+# Начальные векторы хэша в виде 512-битных чисел (256 и 512 бит результата)
+_IV_256 = int('01' * 64, 16)
+_IV_512 = 0
+
+
+def _build_lps_tables():
+    """
+    Строит восемь таблиц 256x64 бит, объединяющих S-, P- и L-преобразования.
+
+    Элемент table[j][b] равен L(PI[b] << 8j): после перестановки TAU байт j
+    исходного слова i попадает в байт i слова j, поэтому слово результата
+    LPS собирается как XOR восьми выборок из таблиц. L линейно, поэтому L(v << 8j)
+    для всех 256 значений v получается XOR-ом строк матрицы за 255 операций.
+    """
+    rows = [int(row, 16) for row in MATRIX_DATA]
+    tables = []
+    for j in range(8):
+        l_byte = [0] * 256
+        for value in range(1, 256):
+            low = value & -value
+            # Бит k байта j — бит 8j + k слова, ему соответствует строка 63 - (8j + k)
+            l_byte[value] = l_byte[value ^ low] ^ rows[63 - 8 * j - (low.bit_length() - 1)]
+        tables.append(tuple(l_byte[PI[byte]] for byte in range(256)))
+    return tuple(tables)
+
+
+# Таблицы LPS строятся при первом хэшировании, а не при импорте модуля
+_lps_tables = None
+
+
+def _get_lps_tables():
+    """
+    :return: Таблицы LPS_TABLES (строятся один раз при первом обращении).
+    """
+    global _lps_tables
+    if _lps_tables is None:
+        _lps_tables = _build_lps_tables()
+    return _lps_tables
+
+
+def __getattr__(name):
+    # Совместимость: LPS_TABLES доступны как атрибут модуля, но строятся лениво
+    if name == 'LPS_TABLES':
+        return _get_lps_tables()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _lps(state):
+    """Композиция L(P(S(state))) над 512-битным числом через таблицы LPS_TABLES."""
+    b = state.to_bytes(64, 'little')
+    t0, t1, t2, t3, t4, t5, t6, t7 = _lps_tables or _get_lps_tables()
+    return int.from_bytes(_PACK_WORDS(*[
+        t0[b[i]] ^ t1[b[i + 8]] ^ t2[b[i + 16]] ^ t3[b[i + 24]]
+        ^ t4[b[i + 32]] ^ t5[b[i + 40]] ^ t6[b[i + 48]] ^ t7[b[i + 56]]
+        for i in range(8)
+    ]), 'little')
+
+
+def _compress_fast(nonce, hash_val, msg):
+    """Функция сжатия g(N, h, m) над 512-битными числами."""
+    key = _lps(hash_val ^ nonce)
+    state = msg
+    for const in CONSTANTS:
+        state = _lps(key ^ state)
+        key = _lps(key ^ const)
+    return state ^ key ^ hash_val ^ msg
+
+
+def _compress_profiled(nonce, hash_val, msg):
+    """Функция сжатия с замером времени расписания ключей и раундов (см. set_stage_profiler)."""
+    started = time.perf_counter()
+    keys = [_lps(hash_val ^ nonce)]
+    for const in CONSTANTS:
+        keys.append(_lps(keys[-1] ^ const))
+    scheduled = time.perf_counter()
+    state = msg
+    for key in keys[:-1]:
+        state = _lps(key ^ state)
+    finished = time.perf_counter()
+    _stage_profiler.add('key_schedule', scheduled - started)
+    _stage_profiler.add('rounds', finished - scheduled)
+    return state ^ keys[-1] ^ hash_val ^ msg
+
+
+# Активная функция сжатия; set_stage_profiler подменяет её профилирующей версией
+_compress = _compress_fast
+_stage_profiler = None
+
+
+class StageProfiler:
+    """
+    Накопитель времени по этапам хэширования.
+
+    Табличная реализация сообщает этапы key_schedule и rounds (S, P и L в ней
+    объединены в одну выборку), эталонная — S, P, L и key_schedule (в него
+    входят и S, P, L самого расписания ключей).
+    """
+
+    def __init__(self):
+        self.stages = {}
+
+    def add(self, stage, seconds):
+        """Добавляет один замер этапа stage."""
+        calls, total = self.stages.get(stage, (0, 0.0))
+        self.stages[stage] = (calls + 1, total + seconds)
+
+    def wrap(self, stage, func):
+        """Возвращает обёртку над func, замеряющую каждый вызов как этап stage."""
+        def timed(*args):
+            started = time.perf_counter()
+            result = func(*args)
+            self.add(stage, time.perf_counter() - started)
+            return result
+        return timed
+
+    def report(self):
+        """
+        :return: Словарь {этап: {'calls', 'total_s', 'mean_us'}}.
+        """
+        return {
+            stage: {'calls': calls, 'total_s': total, 'mean_us': total / calls * 1e6}
+            for stage, (calls, total) in self.stages.items()
+        }
+
+
+def set_stage_profiler(profiler):
+    """
+    Включает (StageProfiler) или выключает (None) замеры этапов хэширования.
+
+    Пока профилирование выключено, функция сжатия не содержит никаких проверок.
+
+    :param profiler: Объект StageProfiler или None.
+    """
+    global _compress, _stage_profiler
+    _stage_profiler = profiler
+    _compress = _compress_fast if profiler is None else _compress_profiled
+
+
+# Кэш результатов streebog_digest (LRUCache) и максимальная длина кэшируемого входа
+_digest_cache = None
+_digest_cache_limit = 0
+
+
+def set_digest_cache(cache, max_input_size=1024):
+    """
+    Включает (LRUCache) или выключает (None) кэш хэшей по байтам входа.
+
+    Кэш используют streebog_digest, streebog_hash и streebog_digest_many. Входы
+    длиннее max_input_size не кэшируются, поэтому память ограничена
+    cache.maxsize * (max_input_size + 32) байт плюс накладные расходы словаря.
+
+    :param cache: Объект LRUCache или None.
+    :param max_input_size: Максимальная длина кэшируемого входа в байтах.
+    """
+    global _digest_cache, _digest_cache_limit
+    _digest_cache = cache
+    _digest_cache_limit = max_input_size
+
+
+def _finalize(hash_val, nonce, checksum, tail, tail_bits, digest_size=256):
+    """
+    Завершающий этап хэширования: дополнение остатка и сжатие длины и контрольной суммы.
+
+    :param hash_val: Текущее значение h после обработки полных блоков.
+    :param nonce: Текущее значение счётчика длины N.
+    :param checksum: Текущая контрольная сумма Sigma.
+    :param tail: Неполный остаток сообщения в виде числа.
+    :param tail_bits: Длина остатка в битах (0..511).
+    :param digest_size: Размер результата в битах: 256 или 512.
+    :return: Хэш в виде целого числа.
+    """
+    # Добавление padding
+    padded = (1 << tail_bits) | tail
+    hash_val = _compress(nonce, hash_val, padded)
+    nonce = (nonce + tail_bits) & _MASK512
+    checksum = (checksum + padded) & _MASK512
+    hash_val = _compress(0, hash_val, nonce)
+    hash_val = _compress(0, hash_val, checksum)
+    return hash_val >> 256 if digest_size == 256 else hash_val
+
+
+def _hash_blocks(blocks, tail, tail_bits, digest_size=256):
+    """
+    Вычисляет хэш по последовательности полных 512-битных блоков и неполному остатку.
+
+    :param blocks: Итерируемая последовательность 512-битных блоков в порядке обработки
+        (начиная с младших разрядов сообщения).
+    :param tail: Старшая неполная часть сообщения в виде числа.
+    :param tail_bits: Длина остатка в битах (0..511).
+    :param digest_size: Размер результата в битах: 256 или 512.
+    :return: Хэш в виде целого числа.
+    """
+    hash_val = _IV_256 if digest_size == 256 else _IV_512
+    nonce = 0
+    checksum = 0
+    for block in blocks:
+        hash_val = _compress(nonce, hash_val, block)
+        nonce = (nonce + 512) & _MASK512
+        checksum = (checksum + block) & _MASK512
+    return _finalize(hash_val, nonce, checksum, tail, tail_bits, digest_size)
+
+
+def as_bytes(value):
+    """
+    Приводит hex-строку или bytes-подобный объект к bytes.
+
+    :param value: hex-строка, bytes, bytearray или memoryview.
+    :return: Значение в виде bytes.
+    """
+    if isinstance(value, str):
+        return bytes.fromhex(value)
+    return bytes(value)
+
+
+def message_bytes(message):
+    """
+    Байты, которые хэшируются для транзакции или подписываемого сообщения.
+
+    Транзакция подписывается и попадает в лист дерева Меркла в виде текстовой
+    hex-записи. Строка уже является такой записью (или обычным текстом) и берётся
+    в UTF-8, а bytes-подобный объект — это сами байты транзакции, и вместо них
+    берётся их hex-запись. Правило общее для merkle_tree и Schnorr_sign.
+
+    :param message: Строка или bytes-подобный объект с байтами транзакции.
+    :return: Байты для хэширования.
+    """
+    if isinstance(message, str):
+        return message.encode('utf-8')
+    return bytes(message).hex().encode('ascii')
+
+
+def streebog_digest(data):
+    """
+    Хэш ГОСТ Р 34.11-2018 (256 бит) байтовой строки без промежуточных hex-строк.
+
+    Байты рассматриваются как число, записанное старшим байтом вперёд (как в
+    streebog_hash), поэтому полные блоки читаются из memoryview с конца данных.
+    Если включён кэш (set_digest_cache), повторный вход не хэшируется заново.
+
+    :param data: Данные (bytes, bytearray или memoryview).
+    :return: Хэш (32 байта, старший байт первым).
+    """
+    if _digest_cache is None or len(data) > _digest_cache_limit:
+        return _digest(data)
+    key = bytes(data)
+    digest = _digest_cache.get(key)
+    if digest is None:
+        digest = _digest(key)
+        _digest_cache.put(key, digest)
+    return digest
+
+
+def _digest(data):
+    view = memoryview(data).cast('B')
+    length = len(view)
+    full, rest = divmod(length, 64)
+    blocks = (int.from_bytes(view[length - 64 * (i + 1):length - 64 * i], 'big') for i in range(full))
+    tail = int.from_bytes(view[:rest], 'big')
+    return _hash_blocks(blocks, tail, rest * 8).to_bytes(32, 'big')
 
 
 def streebog_hash(input_str, is_hex=False):
     """
-        Реализация хэш-функции ГОСТ Р 34.11-2018 (Стрибог).
+        Реализация хэш-функции ГОСТ Р 34.11-2018 (Стрибог) на 64-битных словах.
+
+        Состояние хранится как 512-битное число, а S-, P- и L-преобразования
+        выполняются за один проход по предвычисленным таблицам LPS_TABLES.
+        Обёртка над streebog_digest для строкового интерфейса.
 
         Аргументы:
             input_str (str): Входная строка для хеширования.
@@ -12,75 +342,319 @@ def streebog_hash(input_str, is_hex=False):
         Возвращает:
             str: Хэш-сумма (256 бит) в шестнадцатеричном формате.
         """
+    if not is_hex:
+        return streebog_digest(input_str.encode('utf-8')).hex()
+    if len(input_str) % 2 == 0:
+        return streebog_digest(bytes.fromhex(input_str)).hex()
 
-    # S-блок (таблица подстановки)
-    PI = (
-        252, 238, 221, 17, 207, 110, 49, 22, 251, 196, 250, 218, 35, 197, 4, 77, 233, 119, 240, 219, 147,
-        46, 153, 186, 23, 54, 241, 187, 20, 205, 95, 193, 249, 24, 101, 90, 226, 92, 239, 33, 129, 28, 60, 66, 139, 1,
-        142, 79, 5, 132, 2, 174, 227, 106, 143, 160, 6, 11, 237, 152, 127, 212, 211, 31, 235, 52, 44, 81, 234, 200,
-        72, 171, 242, 42, 104, 162, 253, 58, 206, 204, 181, 112, 14, 86, 8, 12, 118, 18, 191, 114, 19, 71, 156, 183,
-        93, 135, 21, 161, 150, 41, 16, 123, 154, 199, 243, 145, 120, 111, 157, 158, 178, 177, 50, 117, 25, 61, 255,
-        53, 138, 126, 109, 84, 198, 128, 195, 189, 13, 87, 223, 245, 36, 169, 62, 168, 67, 201, 215, 121, 214, 246,
-        124, 34, 185, 3, 224, 15, 236, 222, 122, 148, 176, 188, 220, 232, 40, 80, 78, 51, 10, 74, 167, 151, 96, 115,
-        30, 0, 98, 68, 26, 184, 56, 130, 100, 159, 38, 65, 173, 69, 70, 146, 39, 94, 85, 47, 140, 163, 165, 125, 105,
-        213, 149, 59, 7, 88, 179, 64, 134, 172, 29, 247, 48, 55, 107, 228, 136, 217, 231, 137, 225, 27, 131, 73, 76,
-        63, 248, 254, 141, 83, 170, 144, 202, 216, 133, 97, 32, 113, 103, 164, 45, 43, 9, 91, 203, 155, 37, 208, 190,
-        229, 108, 82, 89, 166, 116, 210, 230, 244, 180, 192, 209, 102, 175, 194, 57, 75, 99, 182
-    )
+    # Нечётное число hex-символов: длина сообщения не кратна байту,
+    # поэтому блоки отрезаются с конца строки по 128 символов
+    length = len(input_str)
+    full, rest = divmod(length, 128)
+    blocks = (int(input_str[length - 128 * (i + 1):length - 128 * i], 16) for i in range(full))
+    return format(_hash_blocks(blocks, int(input_str[:rest], 16), rest * 4), '064x')
 
-    # Начальный вектор хэша: 512 битов, чередующихся '00000001'
-    INIT_VEC = [int(bit) for bit in '00000001' * 64]
 
-    # Таблица перестановки байтов
-    TAU = (
-        0, 8, 16, 24, 32, 40, 48, 56, 1, 9, 17, 25, 33, 41, 49, 57, 2, 10, 18, 26, 34, 42, 50, 58, 3, 11, 19, 27,
-        35, 43, 51, 59, 4, 12, 20, 28, 36, 44, 52, 60, 5, 13, 21, 29, 37, 45, 53, 61, 6, 14, 22, 30, 38, 46, 54, 62,
-        7, 15, 23, 31, 39, 47, 55, 63
-    )
+class Streebog256:
+    """
+    Потоковый хэш ГОСТ Р 34.11-2018 (256 бит) с интерфейсом в стиле hashlib.
 
-    # 12 раундовых констант в 512-битном формате
-    CONSTANTS = [
-        0xb1085bda1ecadae9ebcb2f81c0657c1f2f6a76432e45d016714eb88d7585c4fc4b7ce09192676901a2422a08a460d31505767436cc744d23dd806559f2a64507,
-        0x6fa3b58aa99d2f1a4fe39d460f70b5d7f3feea720a232b9861d55e0f16b501319ab5176b12d699585cb561c2db0aa7ca55dda21bd7cbcd56e679047021b19bb7,
-        0xf574dcac2bce2fc70a39fc286a3d843506f15e5f529c1f8bf2ea7514b1297b7bd3e20fe490359eb1c1c93a376062db09c2b6f443867adb31991e96f50aba0ab2,
-        0xef1fdfb3e81566d2f948e1a05d71e4dd488e857e335c3c7d9d721cad685e353fa9d72c82ed03d675d8b71333935203be3453eaa193e837f1220cbebc84e3d12e,
-        0x4bea6bacad4747999a3f410c6ca923637f151c1f1686104a359e35d7800fffbdbfcd1747253af5a3dfff00b723271a167a56a27ea9ea63f5601758fd7c6cfe57,
-        0xae4faeae1d3ad3d96fa4c33b7a3039c02d66c4f95142a46c187f9ab49af08ec6cffaa6b71c9ab7b40af21f66c2bec6b6bf71c57236904f35fa68407a46647d6e,
-        0xf4c70e16eeaac5ec51ac86febf240954399ec6c7e6bf87c9d3473e33197a93c90992abc52d822c3706476983284a05043517454ca23c4af38886564d3a14d493,
-        0x9b1f5b424d93c9a703e7aa020c6e41414eb7f8719c36de1e89b4443b4ddbc49af4892bcb929b069069d18d2bd1a5c42f36acc2355951a8d9a47f0dd4bf02e71e,
-        0x378f5a541631229b944c9ad8ec165fde3a7d3a1b258942243cd955b7e00d0984800a440bdbb2ceb17b2b8a9aa6079c540e38dc92cb1f2a607261445183235adb,
-        0xabbedea680056f52382ae548b2e4f3f38941e71cff8a78db1fffe18a1b3361039fe76702af69334b7a1e6c303b7652f43698fad1153bb6c374b4c7fb98459ced,
-        0x7bcd9ed0efc889fb3002c6cd635afe94d8fa6bbbebab076120018021148466798a1d71efea48b9caefbacd1d7d476e98dea2594ac06fd85d6bcaa4cd81f32d1b,
-        0x378ee767f11631bad21380b00449b17acda43c32bcdf1d77f82012d430219f9b5d80ef9d1891cc86e71da4aa88e12852faf417d5d9b21b9948bc924af11bd720
-    ]
-
-    # Матрица L-преобразования
-    MATRIX_DATA = [
-        "8e20faa72ba0b470", "47107ddd9b505a38", "ad08b0e0c3282d1c", "d8045870ef14980e",
-        "6c022c38f90a4c07", "3601161cf205268d", "1b8e0b0e798c13c8", "83478b07b2468764",
-        "a011d380818e8f40", "5086e740ce47c920", "2843fd2067adea10", "14aff010bdd87508",
-        "0ad97808d06cb404", "05e23c0468365a02", "8c711e02341b2d01", "46b60f011a83988e",
-        "90dab52a387ae76f", "486dd4151c3dfdb9", "24b86a840e90f0d2", "125c354207487869",
-        "092e94218d243cba", "8a174a9ec8121e5d", "4585254f64090fa0", "accc9ca9328a8950",
-        "9d4df05d5f661451", "c0a878a0a1330aa6", "60543c50de970553", "302a1e286fc58ca7",
-        "18150f14b9ec46dd", "0c84890ad27623e0", "0642ca05693b9f70", "0321658cba93c138",
-        "86275df09ce8aaa8", "439da0784e745554", "afc0503c273aa42a", "d960281e9d1d5215",
-        "e230140fc0802984", "71180a8960409a42", "b60c05ca30204d21", "5b068c651810a89e",
-        "456c34887a3805b9", "ac361a443d1c8cd2", "561b0d22900e4669", "2b838811480723ba",
-        "9bcf4486248d9f5d", "c3e9224312c8c1a0", "effa11af0964ee50", "f97d86d98a327728",
-        "e4fa2054a80b329c", "727d102a548b194e", "39b008152acb8227", "9258048415eb419d",
-        "492c024284fbaec0", "aa16012142f35760", "550b8e9e21f7a530", "a48b474f9ef5dc18",
-        "70a6a56e2440598e", "3853dc371220a247", "1ca76e95091051ad", "0edd37c48a08a6d8",
-        "07e095624504536c", "8d70c431ac02a736", "c83862965601dd1b", "641c314b2b8ee083"
-    ]
-
-    # Преобразование строки MATRIX_DATA в битовую матрицу
-    TRANSFORM_MATRIX = []
-    for hex_row in MATRIX_DATA:
-        row_bits = []
-        for char in hex_row:
-            row_bits.extend([int(bit) for bit in format(int(char, 16), '04b')])
-        TRANSFORM_MATRIX.append(row_bits)
+    Байты обрабатываются в порядке поступления, как в стандарте: первый байт
+    сообщения является младшим байтом первого блока, а digest() возвращает
+    хэш младшим байтом вперёд. streebog_hash(s) записывает сообщение и хэш
+    старшими разрядами вперёд, поэтому для байтовой строки data
+    streebog_hash(data.hex(), is_hex=True) == Streebog256(data[::-1]).digest()[::-1].hex().
+
+    Метод copy() сохраняет промежуточное состояние (midstate), что позволяет
+    один раз обработать общий префикс и продолжать хэширование с разными окончаниями.
+    """
+
+    name = 'streebog256'
+    digest_size = 32
+    block_size = 64
+
+    def __init__(self, data=b''):
+        """
+        :param data: Начальные данные (bytes, bytearray или memoryview).
+        """
+        self._hash_val = _IV_256 if self.digest_size == 32 else _IV_512
+        self._nonce = 0
+        self._checksum = 0
+        self._buffer = bytearray()
+        if data:
+            self.update(data)
+
+    def update(self, data):
+        """
+        Добавляет данные к хэшируемому сообщению.
+
+        Полные 64-байтовые блоки читаются прямо из memoryview без копирования
+        всего буфера; во внутреннем буфере остаётся только неполный хвост.
+
+        :param data: Данные (bytes, bytearray или memoryview).
+        """
+        view = memoryview(data).cast('B')
+        offset = 0
+        if self._buffer:
+            offset = min(64 - len(self._buffer), len(view))
+            self._buffer += view[:offset]
+            if len(self._buffer) < 64:
+                return
+            self._process(self._buffer)
+            self._buffer = bytearray()
+
+        hash_val, nonce, checksum = self._hash_val, self._nonce, self._checksum
+        end = len(view) - 64
+        while offset <= end:
+            block = int.from_bytes(view[offset:offset + 64], 'little')
+            hash_val = _compress(nonce, hash_val, block)
+            nonce = (nonce + 512) & _MASK512
+            checksum = (checksum + block) & _MASK512
+            offset += 64
+        self._hash_val, self._nonce, self._checksum = hash_val, nonce, checksum
+        self._buffer += view[offset:]
+
+    def _process(self, block_bytes):
+        """Обрабатывает один полный 64-байтовый блок."""
+        block = int.from_bytes(block_bytes, 'little')
+        self._hash_val = _compress(self._nonce, self._hash_val, block)
+        self._nonce = (self._nonce + 512) & _MASK512
+        self._checksum = (self._checksum + block) & _MASK512
+
+    def copy(self):
+        """
+        Возвращает независимую копию текущего состояния хэша.
+
+        :return: Новый объект того же класса.
+        """
+        other = self.__class__.__new__(self.__class__)
+        other._hash_val = self._hash_val
+        other._nonce = self._nonce
+        other._checksum = self._checksum
+        other._buffer = bytearray(self._buffer)
+        return other
+
+    def digest(self):
+        """
+        Возвращает хэш уже переданных данных; объект можно продолжать обновлять.
+
+        :return: Хэш (digest_size байт) младшим байтом вперёд.
+        """
+        result = _finalize(self._hash_val, self._nonce, self._checksum,
+                           int.from_bytes(self._buffer, 'little'), len(self._buffer) * 8,
+                           self.digest_size * 8)
+        return result.to_bytes(self.digest_size, 'little')
+
+    def hexdigest(self):
+        """
+        :return: Хэш в виде hex-строки (в порядке байтов digest()).
+        """
+        return self.digest().hex()
+
+
+class Streebog512(Streebog256):
+    """Потоковый хэш ГОСТ Р 34.11-2018 с 512-битным результатом."""
+
+    name = 'streebog512'
+    digest_size = 64
+
+# Таблицы LPS и раундовые константы в виде массивов NumPy для пакетного режима;
+# NumPy импортируется только при первом пакетном вызове
+np = None
+_LPS_TABLES_NP = None
+_CONSTANT_WORDS = None
+
+
+def _load_numpy():
+    """Импортирует NumPy и строит массивы таблиц для пакетного режима (один раз)."""
+    global np, _LPS_TABLES_NP, _CONSTANT_WORDS
+    if _CONSTANT_WORDS is None:
+        import numpy
+        np = numpy
+        _LPS_TABLES_NP = np.array(_get_lps_tables(), dtype=np.uint64)
+        _CONSTANT_WORDS = np.array(
+            [[(const >> (64 * i)) & 0xFFFFFFFFFFFFFFFF for i in range(8)] for const in CONSTANTS],
+            dtype=np.uint64
+        )
+
+
+def _to_words(value):
+    """Переводит 512-битное число в массив из восьми 64-битных слов (младшее слово первым)."""
+    return np.array([(value >> (64 * i)) & 0xFFFFFFFFFFFFFFFF for i in range(8)], dtype=np.uint64)
+
+
+def _lps_many(states):
+    """Пакетное LPS-преобразование массива состояний формы (N, 8)."""
+    # state_bytes[n, j, i] — байт i слова j; слово i результата собирается по всем j
+    state_bytes = np.ascontiguousarray(states, dtype='<u8').view(np.uint8).reshape(-1, 8, 8)
+    result = _LPS_TABLES_NP[0][state_bytes[:, 0]]
+    for j in range(1, 8):
+        result ^= _LPS_TABLES_NP[j][state_bytes[:, j]]
+    return result
+
+
+def _compress_many(nonce, hash_vals, msgs):
+    """Пакетная функция сжатия g(N, h, m) над массивами формы (N, 8)."""
+    key = _lps_many(hash_vals ^ nonce)
+    state = msgs
+    for const in _CONSTANT_WORDS:
+        state = _lps_many(key ^ state)
+        key = _lps_many(key ^ const)
+    return state ^ key ^ hash_vals ^ msgs
+
+
+def _add_many(a, b):
+    """Сложение по модулю 2^512 массивов формы (N, 8) с переносом между словами."""
+    result = np.empty_like(a)
+    carry = np.zeros(a.shape[0], dtype=np.uint64)
+    for i in range(8):
+        partial = a[:, i] + b[:, i]
+        total = partial + carry
+        carry = ((partial < a[:, i]) | (total < partial)).astype(np.uint64)
+        result[:, i] = total
+    return result
+
+
+def _hash_equal_length(data, bit_length):
+    """
+    Хэширует пакет сообщений одинаковой длины.
+
+    :param data: Массив uint8 формы (N, ceil(bit_length / 8)) в порядке байтов стандарта.
+    :param bit_length: Длина каждого сообщения в битах.
+    :return: Массив хэшей формы (N, 8) в виде 64-битных слов.
+    """
+    count = data.shape[0]
+    hash_vals = np.tile(_to_words(_IV_256), (count, 1))
+    checksum = np.zeros((count, 8), dtype=np.uint64)
+    nonce = 0
+    full, tail_bits = divmod(bit_length, 512)
+    for k in range(full):
+        block = np.ascontiguousarray(data[:, 64 * k:64 * (k + 1)]).view('<u8').astype(np.uint64)
+        hash_vals = _compress_many(_to_words(nonce), hash_vals, block)
+        nonce = (nonce + 512) & _MASK512
+        checksum = _add_many(checksum, block)
+    # Добавление padding
+    padded_bytes = np.zeros((count, 64), dtype=np.uint8)
+    tail = data[:, 64 * full:]
+    padded_bytes[:, :tail.shape[1]] = tail
+    padded = padded_bytes.view('<u8').astype(np.uint64)
+    padded[:, tail_bits // 64] |= np.uint64(1 << (tail_bits % 64))
+    hash_vals = _compress_many(_to_words(nonce), hash_vals, padded)
+    nonce = (nonce + tail_bits) & _MASK512
+    checksum = _add_many(checksum, padded)
+    zero = _to_words(0)
+    hash_vals = _compress_many(zero, hash_vals, np.tile(_to_words(nonce), (count, 1)))
+    return _compress_many(zero, hash_vals, checksum)
+
+
+def _batch_digests(items):
+    """
+    Пакетно хэширует сообщения, группируя их по длине.
+
+    :param items: Список пар (длина в битах, данные в порядке байтов стандарта).
+    :return: Список хэшей (32 байта, старший байт первым) в порядке входа.
+    """
+    groups = {}
+    for index, (bit_length, data) in enumerate(items):
+        indices, chunks = groups.setdefault(bit_length, ([], []))
+        indices.append(index)
+        chunks.append(data)
+
+    results = [None] * len(items)
+    if groups:
+        _load_numpy()
+    for bit_length, (indices, chunks) in groups.items():
+        data = np.frombuffer(b''.join(chunks), dtype=np.uint8).reshape(len(chunks), -1)
+        hashes = _hash_equal_length(data, bit_length)
+        # Старшие 256 бит, записанные старшим байтом вперёд
+        digests = np.ascontiguousarray(hashes[:, 4:], dtype='<u8').view(np.uint8)[:, ::-1]
+        for index, row in zip(indices, digests):
+            results[index] = row.tobytes()
+    return results
+
+
+def streebog_digest_many(messages, cached=True):
+    """
+    Пакетное вычисление streebog_digest для списка байтовых строк.
+
+    Сообщения группируются по длине; каждая группа упаковывается в массив
+    uint64 формы (N, 8) на блок, и функция сжатия выполняется сразу над всеми
+    строками выборками из таблиц LPS и операциями XOR.
+
+    :param messages: Последовательность bytes-подобных объектов.
+    :param cached: Использовать кэш set_digest_cache; False для заведомо
+        неповторяющихся входов (перебор nonce), чтобы не вытеснять полезные записи.
+    :return: Список хэшей (32 байта, старший байт первым), в порядке входа.
+    """
+    messages = [bytes(message) for message in messages]
+    if not cached or _digest_cache is None:
+        return _batch_digests([(len(message) * 8, message[::-1]) for message in messages])
+
+    results = [None] * len(messages)
+    missing = []
+    for index, message in enumerate(messages):
+        if len(message) <= _digest_cache_limit:
+            results[index] = _digest_cache.get(message)
+        if results[index] is None:
+            missing.append(index)
+    digests = _batch_digests([(len(messages[i]) * 8, messages[i][::-1]) for i in missing])
+    for index, digest in zip(missing, digests):
+        results[index] = digest
+        if len(messages[index]) <= _digest_cache_limit:
+            _digest_cache.put(messages[index], digest)
+    return results
+
+
+def streebog_hash_many(messages, is_hex=False):
+    """
+    Пакетное вычисление streebog_hash для списка сообщений (обёртка над streebog_digest_many).
+
+    :param messages: Последовательность строк (обычных или hex, см. is_hex).
+    :param is_hex: Интерпретировать ли сообщения как hex-строки.
+    :return: Список хэшей (256 бит) в шестнадцатеричном формате, в порядке входа.
+    """
+    items = []
+    for message in messages:
+        if not is_hex:
+            data = message.encode('utf-8')
+            items.append((len(data) * 8, data[::-1]))
+        elif len(message) % 2 == 0:
+            items.append((len(message) * 4, bytes.fromhex(message)[::-1]))
+        else:
+            bit_length = len(message) * 4
+            items.append((bit_length, int(message, 16).to_bytes((bit_length + 7) // 8, 'little')))
+    return [digest.hex() for digest in _batch_digests(items)]
+
+
+_transform_matrix = None
+
+
+def _get_transform_matrix():
+    """Битовая матрица L-преобразования из MATRIX_DATA (строится один раз)."""
+    global _transform_matrix
+    if _transform_matrix is None:
+        _transform_matrix = np.array([[int(bit) for bit in format(int(hex_row, 16), '064b')]
+                                      for hex_row in MATRIX_DATA])
+    return _transform_matrix
+
+
+def streebog_hash_reference(input_str, is_hex=False):
+    """
+        Эталонная побитовая реализация хэш-функции ГОСТ Р 34.11-2018 (Стрибог).
+
+        Медленная, но прямо повторяет определения S-, P- и L-преобразований;
+        используется для сверки с табличной реализацией streebog_hash.
+
+        Аргументы:
+            input_str (str): Входная строка для хеширования.
+            is_hex (bool): Указывает, интерпретировать ли вход как hex-строку (по умолчанию False).
+
+        Возвращает:
+            str: Хэш-сумма (256 бит) в шестнадцатеричном формате.
+        """
+
+    _load_numpy()
+    transform_matrix = _get_transform_matrix()
 
     def to_binary_vector(size, value):
         """Переводит целое число в битовый вектор заданной длины."""
@@ -103,7 +677,7 @@ def streebog_hash(input_str, is_hex=False):
         blocks = [vec[i * 64:i * 64 + 64] for i in range(8)]
         result = []
         for block in blocks:
-            result += [int(k) % 2 for k in np.array(block) @ np.array(TRANSFORM_MATRIX)]
+            result += [int(k) % 2 for k in np.array(block) @ transform_matrix]
         return result
 
     def substitute(vec):
@@ -124,9 +698,8 @@ def streebog_hash(input_str, is_hex=False):
             result += [int(bit) for bit in new_val_bin]
         return result
 
-    def expand_key(key, msg):
-        """Расширение ключа (K_i) и применение 12 раундов к сообщению."""
-        result = msg.copy()
+    def key_schedule(key):
+        """Расширение ключа: K_1 .. K_13."""
         key_list = [key.copy()]
         for i in range(1, 13):
             key_xor_const = xor_vectors(key_list[i - 1], to_binary_vector(512, CONSTANTS[i - 1]))
@@ -134,6 +707,18 @@ def streebog_hash(input_str, is_hex=False):
             perm_key = permute(sub_key)
             lin_key = linear_transform(perm_key)
             key_list.append(lin_key)
+        return key_list
+
+    if _stage_profiler is not None:
+        substitute = _stage_profiler.wrap('S', substitute)
+        permute = _stage_profiler.wrap('P', permute)
+        linear_transform = _stage_profiler.wrap('L', linear_transform)
+        key_schedule = _stage_profiler.wrap('key_schedule', key_schedule)
+
+    def expand_key(key, msg):
+        """Расширение ключа (K_i) и применение 12 раундов к сообщению."""
+        result = msg.copy()
+        key_list = key_schedule(key)
 
         for i in range(12):
             result = linear_transform(permute(substitute(xor_vectors(key_list[i], result))))
@@ -191,8 +776,18 @@ if __name__ == "__main__":
     '''
     test_msg1 = '323130393837363534333231303938373635343332313039383736353433323130393837363534333231303938373635343332313039383736353433323130'
     test_msg2 = 'fbe2e5f0eee3c820fbeafaebef20fffbf0e1e0f0f520e0ed20e8ece0ebe5f0f2f120fff0eeec20f120faf2fee5e2202ce8f6f3ede220e8e6eee1e8f0f2d1202ce8f0f2e5e220e5d1'
+    expected1 = '00557be5e584fd52a449b16b0251d05d27f94ab76cbaa6da890b59d8ef1e159d'
+    expected2 = '508f7e553c06501d749a66fc28c6cac0b005746d97537fa85d9e40904efed29d'
     result1 = streebog_hash(test_msg1,is_hex=True)
     result2 = streebog_hash(test_msg2, is_hex=True)
     print("Примеры из ГОСТ Р 34.11-2018:")
     print(test_msg1, result1,sep=' -> ')
-    print(test_msg2, result2, sep=' -> ')
\ No newline at end of file
+    print(test_msg2, result2, sep=' -> ')
+    assert result1 == expected1 and result2 == expected2, "Несовпадение с контрольными примерами ГОСТ"
+    assert streebog_hash_reference(test_msg1, is_hex=True) == expected1
+
+    # Потоковый интерфейс работает в порядке байтов стандарта (младший байт первым)
+    stream512 = Streebog512(bytes.fromhex(test_msg1)[::-1]).digest()[::-1].hex()
+    print(test_msg1, stream512, sep=' -> (512) ')
+    assert stream512 == ('486f64c1917879417fef082b3381a4e211c324f074654c38823a7b76f830ad00'
+                         'fa1fbae42b1285c0352f227524bc9ab16254288dd6863dccd5b9f54a1ad0541b')
\ No newline at end of file
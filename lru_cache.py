@@ -0,0 +1,99 @@
+import threading
+from collections import OrderedDict, namedtuple
+
+# Снимок счётчиков кэша (hit_rate — доля попаданий среди всех обращений)
+CacheStats = namedtuple('CacheStats', ['hits', 'misses', 'evictions', 'size', 'maxsize', 'hit_rate'])
+
+_MISSING = object()
+
+
+class LRUCache:
+    def __init__(self, maxsize=1024):
+        """
+        Потокобезопасный кэш ограниченного размера с вытеснением давно не использованных записей.
+
+        Считает попадания, промахи и вытеснения, чтобы по ним можно было подобрать maxsize.
+
+        :param maxsize: Максимальное число записей (память растёт не дальше этого числа).
+        """
+        if maxsize <= 0:
+            raise ValueError("Размер кэша должен быть положительным")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        # Проверка наличия не меняет ни счётчики, ни порядок вытеснения
+        return key in self._data
+
+    def get(self, key, default=None):
+        """
+        Возвращает значение по ключу и отмечает запись как недавно использованную.
+
+        :param key: Ключ (хэшируемый объект).
+        :param default: Значение при промахе.
+        :return: Значение из кэша или default.
+        """
+        with self._lock:
+            value = self._data.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """
+        Запоминает значение; при переполнении вытесняет самую давнюю запись.
+
+        :param key: Ключ (хэшируемый объект).
+        :param value: Значение.
+        """
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    __setitem__ = put
+
+    def pop(self, key, default=None):
+        """
+        Удаляет запись (счётчики не меняются).
+
+        :param key: Ключ.
+        :param default: Значение, если записи нет.
+        :return: Удалённое значение или default.
+        """
+        with self._lock:
+            return self._data.pop(key, default)
+
+    def items(self):
+        """
+        :return: Список пар (ключ, значение) от давних записей к недавним (счётчики не меняются).
+        """
+        with self._lock:
+            return list(self._data.items())
+
+    def clear(self):
+        """Удаляет все записи и обнуляет счётчики."""
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        """
+        :return: CacheStats со счётчиками попаданий, промахов и вытеснений.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return CacheStats(self.hits, self.misses, self.evictions, len(self._data), self.maxsize,
+                              self.hits / lookups if lookups else 0.0)
@@ -0,0 +1,318 @@
+import heapq
+import itertools
+import threading
+from collections import namedtuple
+
+from lru_cache import LRUCache
+from merkle_tree import MerkleTree, hash_leaf, hash_leaves
+from Schnorr_sign import verify_batch
+
+# Шаблон блока: транзакции в порядке листьев дерева Меркла и его корень
+BlockTemplate = namedtuple('BlockTemplate', ['transactions', 'fees', 'merkle_root'])
+
+
+class PoolEntry:
+    __slots__ = ('tx', 'fee', 'leaf', 'seq', 'slot')
+
+    def __init__(self, tx, fee, leaf, seq):
+        """
+        Транзакция в пуле.
+
+        Атрибут tx — подписанная транзакция (Transaction), slot — номер листа
+        в шаблоне блока или None, если транзакция вне шаблона.
+        """
+        self.tx = tx
+        self.fee = fee
+        self.leaf = leaf
+        self.seq = seq
+        self.slot = None
+
+
+class Mempool:
+    def __init__(self, block_size=1000, max_size=100000, verdict_cache_size=100000):
+        """
+        Пул неподтверждённых транзакций с инкрементальным шаблоном блока.
+
+        Транзакции различаются по хэшу листа Меркла; подпись проверяется при
+        приёме, а вердикт кэшируется. Шаблон блока — block_size транзакций с
+        наибольшей комиссией; он хранится вместе с деревом Меркла, и каждое
+        изменение шаблона пересчитывает только путь одного листа. Кандидаты
+        вне шаблона лежат в куче по комиссии (с ленивым удалением).
+
+        :param block_size: Максимум транзакций в шаблоне блока.
+        :param max_size: Максимум транзакций в пуле; при переполнении вытесняются самые дешёвые.
+        :param verdict_cache_size: Максимум запомненных вердиктов проверки подписи
+            (счётчики попаданий — verdict_cache_stats()).
+        """
+        self.block_size = block_size
+        self.max_size = max_size
+        self.verdict_cache_size = verdict_cache_size
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        self._entries = {}
+        self._verdicts = LRUCache(verdict_cache_size)
+        self._template = []
+        self._tree = MerkleTree()
+        # Кучи: кандидаты вне шаблона (лучший сверху и худший сверху) и худший в шаблоне
+        self._outside_best = []
+        self._outside_worst = []
+        self._template_worst = []
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, tx):
+        return hash_leaf(tx.data) in self._entries
+
+    def _verify(self, tx):
+        """Проверяет подпись транзакции, используя кэш вердиктов (ключ — запись Transaction)."""
+        key = bytes(tx)
+        verdict = self._verdicts.get(key)
+        if verdict is None:
+            verdict = tx.verify()
+            self._remember(key, verdict)
+        return verdict
+
+    def _remember(self, key, verdict):
+        # При переполнении вытесняются давно не использованные вердикты
+        self._verdicts.put(key, verdict)
+
+    def verdict_cache_stats(self):
+        """
+        :return: CacheStats кэша вердиктов проверки подписей.
+        """
+        return self._verdicts.stats()
+
+    def add(self, tx, fee=0, verified=False, leaf=None):
+        """
+        Принимает подписанную транзакцию.
+
+        :param tx: Транзакция (Transaction) с подписью и открытым ключом.
+        :param fee: Комиссия или приоритет: в шаблон попадают транзакции с наибольшим значением.
+        :param verified: Подпись уже проверена вызывающим (например, в пуле процессов).
+        :param leaf: Хэш листа транзакции, если он уже вычислен (hash_leaf).
+        :return: True, если транзакция добавлена; False для дубликата или неверной подписи.
+        """
+        if leaf is None:
+            leaf = hash_leaf(tx.data)
+        if leaf in self._entries:
+            return False
+        # Проверка подписи — самая дорогая часть, она выполняется без блокировки
+        if not verified and not self._verify(tx):
+            return False
+        with self._lock:
+            return self._insert(tx, fee, leaf)
+
+    def add_many(self, transactions, verified=False, leaves=None):
+        """
+        Принимает пакет транзакций, проверяя подписи одной пакетной проверкой.
+
+        Листья хэшируются одним пакетом, а вставка всего пакета идёт под одной блокировкой.
+
+        :param transactions: Последовательность пар (Transaction, fee).
+        :param verified: Подписи уже проверены вызывающим (например, в пуле процессов).
+        :param leaves: Хэши листьев транзакций, если они уже вычислены (hash_leaves).
+        :return: Список флагов: добавлена ли каждая транзакция.
+        """
+        transactions = list(transactions)
+        if leaves is None:
+            leaves = hash_leaves([tx.data for tx, _ in transactions])
+        if not verified:
+            unknown = [tx for tx, _ in transactions if bytes(tx) not in self._verdicts]
+            if unknown and verify_batch([tx.data for tx in unknown], [tx.signature for tx in unknown],
+                                        [tx.public_key for tx in unknown]):
+                for tx in unknown:
+                    self._remember(bytes(tx), True)
+
+        valid = [leaf not in self._entries and (verified or self._verify(tx))
+                 for leaf, (tx, _) in zip(leaves, transactions)]
+        with self._lock:
+            return [ok and self._insert(tx, fee, leaf)
+                    for ok, leaf, (tx, fee) in zip(valid, leaves, transactions)]
+
+    def _insert(self, tx, fee, leaf):
+        """Добавляет проверенную транзакцию (под блокировкой)."""
+        if leaf in self._entries:
+            return False
+        entry = PoolEntry(tx, fee, leaf, next(self._seq))
+        self._entries[leaf] = entry
+
+        if len(self._template) < self.block_size:
+            self._place(entry, len(self._template))
+        else:
+            worst = self._peek(self._template_worst, in_template=True)
+            if worst is not None and (fee, -entry.seq) > (worst.fee, -worst.seq):
+                slot = worst.slot
+                worst.slot = None
+                self._push_outside(worst)
+                self._place(entry, slot)
+            else:
+                self._push_outside(entry)
+
+        if len(self._entries) > self.max_size:
+            victim = self._peek(self._outside_worst, in_template=False)
+            if victim is None:
+                victim = self._peek(self._template_worst, in_template=True)
+            self._remove_entry(victim)
+        self._compact()
+        return leaf in self._entries
+
+    def _place(self, entry, slot):
+        """Ставит транзакцию в лист slot шаблона, обновляя путь в дереве Меркла."""
+        entry.slot = slot
+        if slot == len(self._template):
+            self._template.append(entry)
+            self._tree.append_leaf(entry.leaf)
+        else:
+            self._template[slot] = entry
+            self._tree.update_leaf(slot, entry.leaf)
+        heapq.heappush(self._template_worst, (entry.fee, -entry.seq, entry.leaf))
+
+    def _push_outside(self, entry):
+        heapq.heappush(self._outside_best, (-entry.fee, entry.seq, entry.leaf))
+        heapq.heappush(self._outside_worst, (entry.fee, -entry.seq, entry.leaf))
+
+    def _compact(self):
+        """
+        Перестраивает кучи, в которых устаревших элементов больше, чем вдвое живых.
+
+        Элементы кучи не удаляются при переносе транзакции в шаблон и обратно, поэтому
+        без перестройки кучи росли бы с каждым переносом. Перестройка фильтрует саму
+        кучу, так что её стоимость окупается накопленными устаревшими элементами.
+        """
+        outside = len(self._entries) - len(self._template)
+        for name, live, in_template in (('_outside_best', outside, False), ('_outside_worst', outside, False),
+                                        ('_template_worst', len(self._template), True)):
+            heap = getattr(self, name)
+            if len(heap) <= 2 * live + 64:
+                continue
+            kept = []
+            leaves = set()
+            for item in heap:
+                if self._live(item, in_template) is not None and item[2] not in leaves:
+                    leaves.add(item[2])
+                    kept.append(item)
+            heapq.heapify(kept)
+            setattr(self, name, kept)
+
+    def _live(self, item, in_template):
+        """
+        Транзакция, к которой относится элемент кучи, или None, если элемент устарел.
+
+        Элемент устаревает, когда транзакция удалена, перешла в шаблон или из него,
+        а также когда она удалена и добавлена снова: у новой записи другой seq, и
+        старый элемент с прежней комиссией не должен снова считаться живым.
+        """
+        entry = self._entries.get(item[2])
+        # Второе поле элемента — seq в куче лучших и -seq в кучах худших
+        if entry is None or abs(item[1]) != entry.seq or (entry.slot is not None) != in_template:
+            return None
+        return entry
+
+    def _peek(self, heap, in_template):
+        """Вершина кучи с ленивым удалением устаревших элементов."""
+        while heap:
+            entry = self._live(heap[0], in_template)
+            if entry is not None:
+                return entry
+            heapq.heappop(heap)
+        return None
+
+    def remove(self, txs, leaves=None):
+        """
+        Удаляет транзакции из пула (например, вошедшие в принятый блок).
+
+        :param txs: Транзакции (Transaction).
+        :param leaves: Хэши листьев транзакций, если они уже вычислены (hash_leaves).
+        :return: Число удалённых транзакций.
+        """
+        if leaves is None:
+            leaves = hash_leaves([tx.data for tx in txs])
+        removed = 0
+        with self._lock:
+            for leaf in leaves:
+                entry = self._entries.get(leaf)
+                if entry is not None:
+                    self._remove_entry(entry)
+                    removed += 1
+            self._compact()
+        return removed
+
+    def _remove_entry(self, entry):
+        """Удаляет транзакцию; освободившийся лист шаблона занимает лучший кандидат вне шаблона."""
+        del self._entries[entry.leaf]
+        slot = entry.slot
+        entry.slot = None
+        if slot is None:
+            return
+        candidate = self._peek(self._outside_best, in_template=False)
+        if candidate is not None:
+            self._place(candidate, slot)
+            return
+        # Кандидатов нет: на место удалённого ставится последний лист шаблона
+        last = self._template.pop()
+        self._tree.pop()
+        if last is not entry:
+            last.slot = slot
+            self._template[slot] = last
+            self._tree.update_leaf(slot, last.leaf)
+
+    def block_template(self):
+        """
+        Возвращает текущий шаблон блока без пересчёта хэшей и подписей.
+
+        :return: BlockTemplate с транзакциями в порядке листьев и корнем Меркла (hex).
+        """
+        with self._lock:
+            entries = list(self._template)
+            root = self._tree.root
+        return BlockTemplate(
+            [entry.tx for entry in entries],
+            [entry.fee for entry in entries],
+            root,
+        )
+
+
+def _selfcheck(operations=3000, seed=1):
+    """
+    Сверяет пул с простой моделью на случайных добавлениях, повторных добавлениях
+    с другой комиссией и удалениях: состав пула, шаблон (block_size лучших по
+    комиссии, при равенстве — более ранние), корень Меркла и размер куч.
+    """
+    import random
+
+    from block import Transaction
+
+    rng = random.Random(seed)
+    pool = Mempool(block_size=8, max_size=40)
+    transactions = [Transaction(rng.randbytes(20), (1, 1), 1) for _ in range(80)]
+    leaves = dict(zip(transactions, hash_leaves([tx.data for tx in transactions])))
+    model = {}  # лист -> (fee, seq)
+    seq = 0
+    for step in range(operations):
+        tx = rng.choice(transactions)
+        if rng.random() < 0.3:
+            pool.remove([tx])
+            model.pop(leaves[tx], None)
+        else:
+            fee = rng.randint(0, 20)
+            added = pool.add(tx, fee, verified=True)
+            if leaves[tx] not in model:
+                model[leaves[tx]] = (fee, seq)
+                if len(model) > pool.max_size:
+                    del model[min(model, key=lambda leaf: (model[leaf][0], -model[leaf][1]))]
+                assert added == (leaves[tx] in model), f"шаг {step}: неверный результат add"
+            seq += 1
+        best = sorted(model, key=lambda leaf: (-model[leaf][0], model[leaf][1]))[:pool.block_size]
+        template = pool.block_template()
+        assert set(pool._entries) == set(model), f"шаг {step}: состав пула расходится с моделью"
+        assert {hash_leaf(tx.data) for tx in template.transactions} == set(best), f"шаг {step}: шаблон не из лучших"
+        assert template.merkle_root == MerkleTree([tx.data for tx in template.transactions]).root, \
+            f"шаг {step}: корень Меркла устарел"
+        assert max(len(pool._outside_best), len(pool._outside_worst),
+                   len(pool._template_worst)) <= 2 * len(model) + 64 + 1, f"шаг {step}: кучи растут"
+    print(f"Самопроверка пула пройдена: {operations} операций")
+
+
+if __name__ == "__main__":
+    _selfcheck()
@@ -0,0 +1,243 @@
+from hash_Streebog import as_bytes, message_bytes, streebog_digest, streebog_digest_many
+
+_MASK256 = (1 << 256) - 1
+
+
+def sum_of_hashes(h1, h2):
+    """
+    Складывает два хэша по модулю 2^256.
+
+    :param h1: Первый хэш в hex-строке.
+    :param h2: Второй хэш в hex-строке.
+    :return: Сумма хэшей по модулю 2^256 в hex-строке (длина 64 символа).
+    """
+    return hex((int(h1, 16) + int(h2, 16)) % (2**256))[2:].zfill(64)
+
+
+def sum_of_digests(d1, d2):
+    """
+    Складывает два хэша в байтовом виде по модулю 2^256.
+
+    :param d1: Первый хэш (32 байта, старший байт первым).
+    :param d2: Второй хэш (32 байта, старший байт первым).
+    :return: Сумма хэшей по модулю 2^256 (32 байта).
+    """
+    return ((int.from_bytes(d1, 'big') + int.from_bytes(d2, 'big')) & _MASK256).to_bytes(32, 'big')
+
+
+def hash_pair(d1, d2):
+    """
+    Хэш внутреннего узла дерева: H(d1 + d2 mod 2^256).
+
+    :return: Хэш узла (32 байта).
+    """
+    return streebog_digest(sum_of_digests(d1, d2))
+
+
+def _leaf_input(tx):
+    # Лист — хэш текстовой hex-записи транзакции, как в streebog_hash(tx, is_hex=False)
+    return message_bytes(tx)
+
+
+def hash_leaf(tx):
+    """
+    Хэш листа дерева — хэш транзакции.
+
+    :param tx: Транзакция в виде hex-строки или байтов.
+    :return: Хэш листа (32 байта).
+    """
+    return streebog_digest(_leaf_input(tx))
+
+
+def hash_leaves(transactions):
+    """
+    Хэши листьев для последовательности транзакций одним пакетом streebog_digest_many.
+
+    :param transactions: Транзакции в виде hex-строк или байтов.
+    :return: Список хэшей листьев (32 байта) в том же порядке.
+    """
+    return streebog_digest_many([_leaf_input(tx) for tx in transactions])
+
+
+class MerkleTree:
+    def __init__(self, transactions=()):
+        """
+        Дерево Меркла с сохранёнными уровнями.
+
+        Соседние узлы уровня объединяются через hash_pair, а узел без пары
+        переносится на следующий уровень без изменений (для пяти листьев это
+        даёт корень H(H(h12 + h34) + h5)). Узел фиксирует только сумму своих
+        детей, поэтому доказательство включения состоит не из хэшей соседей,
+        а из их прообразов (см. proof). Узлы хранятся как 32-байтовые строки.
+
+        :param transactions: Начальный список транзакций (hex-строки или байты).
+        """
+        self._build(hash_leaves(transactions))
+
+    @classmethod
+    def from_leaves(cls, leaves):
+        """
+        Строит дерево по уже вычисленным хэшам листьев (например, hash_leaves в пуле процессов).
+
+        :param leaves: Хэши листьев (32 байта).
+        :return: MerkleTree.
+        """
+        tree = cls.__new__(cls)
+        tree._build(list(leaves))
+        return tree
+
+    def _build(self, leaves):
+        """Строит уровни дерева над списком хэшей листьев."""
+        self.levels = [leaves]
+        # Уровни строятся пакетами: все суммы хэшей имеют одинаковую длину
+        while len(self.levels[-1]) > 1:
+            level = self.levels[-1]
+            sums = [sum_of_digests(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+            parents = streebog_digest_many(sums)
+            if len(level) % 2:
+                parents.append(level[-1])
+            self.levels.append(parents)
+
+    def __len__(self):
+        return len(self.levels[0])
+
+    @property
+    def root_digest(self):
+        """Корень дерева (32 байта; None для пустого дерева)."""
+        return self.levels[-1][0] if self.levels[0] else None
+
+    @property
+    def root(self):
+        """Корень дерева в hex-строке (None для пустого дерева)."""
+        return self.levels[-1][0].hex() if self.levels[0] else None
+
+    def append(self, tx):
+        """
+        Добавляет транзакцию и пересчитывает только путь от нового листа к корню.
+
+        :param tx: Транзакция в виде hex-строки или байтов.
+        :return: Индекс добавленного листа.
+        """
+        return self.append_leaf(hash_leaf(tx))
+
+    def append_leaf(self, leaf):
+        """
+        Добавляет лист по готовому хэшу (см. hash_leaf) без хэширования транзакции.
+
+        :param leaf: Хэш листа (32 байта).
+        :return: Индекс добавленного листа.
+        """
+        self.levels[0].append(leaf)
+        index = len(self.levels[0]) - 1
+        self._update_path(index)
+        return index
+
+    def update(self, index, tx):
+        """
+        Заменяет транзакцию в листе index и пересчитывает путь O(log n).
+
+        :param index: Индекс листа.
+        :param tx: Новая транзакция в виде hex-строки или байтов.
+        """
+        self.update_leaf(index, hash_leaf(tx))
+
+    def update_leaf(self, index, leaf):
+        """
+        Заменяет лист index готовым хэшем и пересчитывает путь O(log n).
+
+        :param index: Индекс листа.
+        :param leaf: Новый хэш листа (32 байта).
+        """
+        self.levels[0][index] = leaf
+        self._update_path(index)
+
+    def pop(self):
+        """
+        Удаляет последний лист и пересчитывает путь O(log n).
+
+        :return: Хэш удалённого листа (32 байта).
+        """
+        leaf = self.levels[0].pop()
+        if self.levels[0]:
+            self._update_path(len(self.levels[0]) - 1)
+        else:
+            self.levels = [[]]
+        return leaf
+
+    def _update_path(self, index):
+        """
+        Пересчитывает предков листа index.
+
+        Длина каждого уровня приводится к ceil(длина нижнего / 2), поэтому тот же
+        проход обслуживает и добавление, и удаление последнего листа.
+        """
+        depth = 0
+        while len(self.levels[depth]) > 1:
+            level = self.levels[depth]
+            parent = index // 2
+            left = 2 * parent
+            node = hash_pair(level[left], level[left + 1]) if left + 1 < len(level) else level[left]
+            if depth + 1 == len(self.levels):
+                self.levels.append([])
+            upper = self.levels[depth + 1]
+            del upper[(len(level) + 1) // 2:]
+            if parent < len(upper):
+                upper[parent] = node
+            else:
+                upper.append(node)
+            index = parent
+            depth += 1
+        del self.levels[depth + 1:]
+
+    def _preimage(self, depth, index, transactions):
+        """Байты, хэш которых равен узлу index уровня depth (узел без пары — прообраз его потомка)."""
+        while depth:
+            lower = self.levels[depth - 1]
+            if 2 * index + 1 < len(lower):
+                return sum_of_digests(lower[2 * index], lower[2 * index + 1])
+            depth -= 1
+            index *= 2
+        return _leaf_input(transactions[index])
+
+    def proof(self, index, transactions):
+        """
+        Строит доказательство включения листа index.
+
+        Элемент доказательства — прообраз соседа: сумма хэшей его детей (32 байта)
+        или вход листа, если сосед — лист. Хэш соседа проверяющий вычисляет сам:
+        при комбинировании H(a + b mod 2^256) одного списка хэшей соседей мало,
+        так как подходящий хэш соседа подбирается вычитанием для любой транзакции.
+        Подделка же прообраза требует обращения хэш-функции.
+
+        :param index: Индекс листа.
+        :param transactions: Транзакции дерева в порядке листьев (нужны листья-соседи).
+        :return: Список прообразов соседей (bytes) от листа к корню (уровни без пары пропускаются).
+        """
+        if len(transactions) != len(self.levels[0]):
+            raise ValueError("Число транзакций не совпадает с числом листьев дерева")
+        path = []
+        for depth, level in enumerate(self.levels[:-1]):
+            sibling = index ^ 1
+            if sibling < len(level):
+                path.append(self._preimage(depth, sibling, transactions))
+            index //= 2
+        return path
+
+    @staticmethod
+    def verify_proof(tx, proof, root):
+        """
+        Проверяет доказательство включения транзакции без построения всего дерева.
+
+        Листья и внутренние узлы хэшируются без метки типа; лист транзакции в байтах
+        (hex-запись) не совпадает с 32-байтовой суммой, но транзакция-строка с такими
+        же UTF-8 байтами формально «входит» в дерево.
+
+        :param tx: Транзакция в виде hex-строки или байтов.
+        :param proof: Список прообразов соседей, полученный из MerkleTree.proof.
+        :param root: Ожидаемый корень дерева (байты или hex).
+        :return: True, если транзакция входит в дерево с этим корнем.
+        """
+        node = hash_leaf(tx)
+        for preimage in proof:
+            node = hash_pair(node, streebog_digest(preimage))
+        return node == as_bytes(root)
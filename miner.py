@@ -0,0 +1,151 @@
+import os
+import time
+from collections import namedtuple
+
+from hash_Streebog import as_bytes, streebog_digest, streebog_digest_many
+
+NONCE_SPACE = 2 ** 32
+
+# Результат перебора: nonce и hash равны None, если решение не найдено
+MiningResult = namedtuple('MiningResult', ['nonce', 'hash', 'header', 'hashes', 'elapsed', 'hash_rate'])
+
+
+def difficulty_to_target(difficulty_bits):
+    """
+    Переводит сложность в битах в 256-битную цель.
+
+    :param difficulty_bits: Требуемое число нулевых старших битов хэша.
+    :return: Цель: хэш подходит, если он строго меньше этого числа.
+    """
+    if not 0 <= difficulty_bits <= 256:
+        raise ValueError("Сложность должна быть в диапазоне от 0 до 256 бит")
+    return 1 << (256 - difficulty_bits)
+
+
+def _scan_range(header_prefix, target, start, end, batch_size, stop_event=None):
+    """
+    Перебирает nonce в диапазоне [start, end) пакетами по batch_size заголовков.
+
+    :param header_prefix: Заголовок без nonce (bytes).
+    :return: Кортеж (nonce, hash в байтах, число вычисленных хэшей); nonce и hash
+        равны None, если решение не найдено или перебор остановлен через stop_event.
+    """
+    hashes = 0
+    for batch_start in range(start, end, batch_size):
+        if stop_event is not None and stop_event.is_set():
+            break
+        nonces = range(batch_start, min(batch_start + batch_size, end))
+        digests = streebog_digest_many([header_prefix + nonce.to_bytes(4, 'big') for nonce in nonces],
+                                       cached=False)
+        for nonce, digest in zip(nonces, digests):
+            hashes += 1
+            if int.from_bytes(digest, 'big') < target:
+                return nonce, digest, hashes
+    return None, None, hashes
+
+
+def _mine_worker(header_prefix, target, start, end, batch_size, stop_event, results):
+    """Процесс-исполнитель: перебирает свой участок пространства nonce и сообщает результат."""
+    nonce, digest, hashes = _scan_range(header_prefix, target, start, end, batch_size, stop_event)
+    if nonce is not None:
+        stop_event.set()
+    results.put((nonce, digest, hashes))
+
+
+class Miner:
+    def __init__(self, difficulty_bits=None, target=None, workers=None, batch_size=1024):
+        """
+        Майнер Proof-of-Work для заголовков блока.
+
+        Заголовок подходит, если его хэш streebog_digest меньше target. Пространство
+        32-битных nonce делится на непрерывные участки между процессами пула.
+
+        :param difficulty_bits: Сложность в битах (число нулевых старших битов хэша).
+        :param target: 256-битная цель; задаётся вместо difficulty_bits.
+        :param workers: Число процессов (по умолчанию — число ядер).
+        :param batch_size: Сколько nonce хэшируется одним пакетом streebog_digest_many.
+        """
+        if (difficulty_bits is None) == (target is None):
+            raise ValueError("Нужно указать ровно одно из: difficulty_bits или target")
+        self.target = difficulty_to_target(difficulty_bits) if target is None else target
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+
+    def check(self, block_header):
+        """
+        Проверяет, удовлетворяет ли заголовок цели.
+
+        :param block_header: Заголовок блока (bytes или hex-строка, включая nonce).
+        :return: True, если хэш заголовка меньше цели.
+        """
+        return int.from_bytes(streebog_digest(as_bytes(block_header)), 'big') < self.target
+
+    def mine(self, header_prefix, start=0, end=NONCE_SPACE):
+        """
+        Ищет nonce, при котором хэш заголовка header_prefix ∥ nonce меньше цели.
+
+        :param header_prefix: Заголовок без nonce (size, prev_hash, merkle_root, timestamp):
+            bytes или hex-строка.
+        :param start: Первый проверяемый nonce.
+        :param end: Граница перебора (не включается).
+        :return: MiningResult с найденным nonce, хэшем и заголовком (hex-строки для вывода)
+            и скоростью перебора.
+        """
+        header_prefix = as_bytes(header_prefix)
+        started = time.perf_counter()
+        if self.workers == 1:
+            nonce, digest, hashes = _scan_range(header_prefix, self.target, start, end, self.batch_size)
+        else:
+            nonce, digest, hashes = self._mine_parallel(header_prefix, start, end)
+        elapsed = time.perf_counter() - started
+
+        header = (header_prefix + nonce.to_bytes(4, 'big')).hex() if nonce is not None else None
+        digest = digest.hex() if digest is not None else None
+        hash_rate = hashes / elapsed if elapsed > 0 else 0.0
+        return MiningResult(nonce, digest, header, hashes, elapsed, hash_rate)
+
+    def _mine_parallel(self, header_prefix, start, end):
+        """Распределяет участки nonce по процессам и останавливает их после первого решения."""
+        # multiprocessing нужен только параллельному перебору: импорт модуля miner остаётся быстрым
+        import multiprocessing
+        import queue
+
+        stop_event = multiprocessing.Event()
+        results = multiprocessing.Queue()
+        shard = -(-(end - start) // self.workers)
+        processes = []
+        for shard_start in range(start, end, shard):
+            process = multiprocessing.Process(
+                target=_mine_worker,
+                args=(header_prefix, self.target, shard_start, min(shard_start + shard, end),
+                      self.batch_size, stop_event, results),
+                daemon=True,
+            )
+            process.start()
+            processes.append(process)
+
+        found_nonce, found_digest, hashes = None, None, 0
+        for _ in processes:
+            while True:
+                try:
+                    nonce, digest, worker_hashes = results.get(timeout=0.1)
+                    break
+                except queue.Empty:
+                    if not any(process.is_alive() for process in processes) and results.empty():
+                        raise RuntimeError("Процесс майнинга завершился без результата")
+            hashes += worker_hashes
+            if nonce is not None and found_nonce is None:
+                found_nonce, found_digest = nonce, digest
+                stop_event.set()
+
+        for process in processes:
+            process.join()
+        return found_nonce, found_digest, hashes
+
+
+if __name__ == "__main__":
+    prefix = 'ab' * 72
+    for bits in (4, 8, 12):
+        result = Miner(difficulty_bits=bits).mine(prefix)
+        print(f"difficulty {bits} бит: nonce {result.nonce}, hash {result.hash}, "
+              f"{result.hashes} хэшей за {result.elapsed:.2f} с ({result.hash_rate:.0f} H/s)")
@@ -0,0 +1,542 @@
+import argparse
+import asyncio
+import hashlib
+import logging
+import os
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from block import BlockHeader, Transaction
+from chain_storage import decode_block, encode_block
+from chain_validator import check_block
+from lru_cache import LRUCache
+from mempool import Mempool
+from merkle_tree import hash_leaves
+from miner import Miner, difficulty_to_target
+from Schnorr_sign import verify_batch
+
+# Типы сообщений протокола
+MSG_TX = 1
+MSG_BLOCK = 2
+
+# Кадр: длина (4 байта, старшим байтом вперёд, включает байт типа), тип и данные
+_FRAME = struct.Struct('>IB')
+_FEE = struct.Struct('>Q')  # комиссия перед записью Transaction
+MAX_MESSAGE_SIZE = 16 * 1024 * 1024
+
+_log = logging.getLogger(__name__)
+
+
+def encode_frame(msg_type, payload):
+    """
+    Упаковывает сообщение в кадр протокола.
+
+    :param msg_type: Тип сообщения (MSG_TX или MSG_BLOCK).
+    :param payload: Данные сообщения (bytes).
+    :return: Кадр (bytes).
+    """
+    return _FRAME.pack(len(payload) + 1, msg_type) + payload
+
+
+async def read_frame(reader):
+    """
+    Читает один кадр из потока.
+
+    :param reader: asyncio.StreamReader.
+    :return: Кортеж (тип сообщения, данные).
+    """
+    length, msg_type = _FRAME.unpack(await reader.readexactly(_FRAME.size))
+    if not 1 <= length <= MAX_MESSAGE_SIZE:
+        raise ValueError(f"Недопустимая длина сообщения: {length}")
+    return msg_type, await reader.readexactly(length - 1)
+
+
+def encode_transaction(tx, fee=0):
+    """
+    Кодирует транзакцию: комиссия (8 байт) и запись Transaction.
+
+    :param tx: Транзакция (Transaction).
+    :param fee: Комиссия (неотрицательное целое до 2^64).
+    :return: Данные сообщения MSG_TX.
+    """
+    return _FEE.pack(fee) + bytes(tx)
+
+
+def decode_transaction(payload):
+    """
+    Разбирает данные сообщения MSG_TX.
+
+    :param payload: Данные, созданные encode_transaction.
+    :return: Кортеж (Transaction, комиссия).
+    """
+    if len(payload) < _FEE.size:
+        raise ValueError("Неверная длина сообщения с транзакцией")
+    tx, end = Transaction.from_buffer(payload, _FEE.size)
+    if end != len(payload):
+        raise ValueError("Неверная длина сообщения с транзакцией")
+    return tx, _FEE.unpack_from(payload)[0]
+
+
+def inventory_id(payload):
+    """
+    Идентификатор сообщения для отсева повторов: 16 байт BLAKE2b от данных.
+
+    Хэш вычисляется в C и не нагружает цикл событий, а размер записи в кэше
+    увиденных сообщений не зависит от размера сообщения.
+
+    :param payload: Данные сообщения.
+    :return: Идентификатор (16 байт).
+    """
+    return hashlib.blake2b(payload, digest_size=16).digest()
+
+
+def _verify_transactions(transactions):
+    """
+    Проверяет подписи пакета транзакций и хэширует их листья (выполняется в пуле процессов).
+
+    :param transactions: Список Transaction.
+    :return: Кортеж (список флагов корректности подписей, список хэшей листьев).
+    """
+    messages = [tx.data for tx in transactions]
+    leaves = hash_leaves(messages)
+    if verify_batch(messages, [tx.signature for tx in transactions], [tx.public_key for tx in transactions]):
+        return [True] * len(transactions), leaves
+    return [tx.verify() for tx in transactions], leaves
+
+
+def _check_block_payload(payload, target):
+    """
+    Разбирает и проверяет блок из сообщения MSG_BLOCK (выполняется в пуле процессов).
+
+    :param payload: Данные сообщения (запись блока, encode_block).
+    :param target: 256-битная цель Proof-of-Work.
+    :return: Кортеж (StoredBlock или None, причина ошибки или None, хэши листьев транзакций).
+    """
+    try:
+        block = decode_block(payload)
+    except ValueError as error:
+        return None, f"неверная запись блока: {error}", None
+    leaves = hash_leaves([tx.data for tx in block.transactions])
+    _, _, reason = check_block(block, target, leaves)
+    return block, reason, leaves
+
+
+class _Peer:
+    def __init__(self, reader, writer, queue_size):
+        """Соединение с соседним узлом и очередь исходящих кадров."""
+        self.reader = reader
+        self.writer = writer
+        self.address = writer.get_extra_info('peername')
+        self.outgoing = asyncio.Queue(queue_size)
+        self.tasks = []
+
+    def send(self, frame):
+        """Ставит кадр в очередь; соединение с отстающим соседом закрывается."""
+        try:
+            self.outgoing.put_nowait(frame)
+        except asyncio.QueueFull:
+            self.writer.close()
+
+    async def sender(self):
+        while True:
+            frame = await self.outgoing.get()
+            self.writer.write(frame)
+            if self.outgoing.empty():
+                await self.writer.drain()
+
+
+class Node:
+    def __init__(self, host='127.0.0.1', port=0, difficulty_bits=None, target=None, chain=None, mempool=None,
+                 workers=None, batch_size=64, max_pending=None, seen_cache_size=100000, peer_queue_size=10000,
+                 tx_queue_size=10000, block_queue_size=100):
+        """
+        Узел сети: принимает транзакции и блоки по TCP, проверяет их и рассылает соседям.
+
+        Протокол — кадры «длина (4 байта) ∥ тип (1 байт) ∥ данные»: MSG_TX несёт
+        комиссию и запись Transaction (encode_transaction), MSG_BLOCK —
+        блок в формате записи журнала цепочки (encode_block). Подписи транзакций
+        (пакетами verify_batch), блоки (check_block) и хэши листьев проверяются в
+        пуле процессов, а вставка в пул и запись блока в цепочку — в отдельном
+        потоке, поэтому цикл событий не занят хэшированием. Очереди проверки
+        ограничены: пока очередь заполнена, чтение от соседей приостанавливается.
+        Дальше рассылаются только впервые увиденные и прошедшие проверку
+        транзакции и блоки.
+
+        Блок принимается, если он продолжает текущую вершину (ветвления не
+        поддерживаются); его транзакции удаляются из пула.
+
+        :param host: Адрес для входящих соединений.
+        :param port: Порт (0 — выбрать свободный, см. атрибут port после start).
+        :param difficulty_bits: Сложность в битах (вместо target).
+        :param target: 256-битная цель Proof-of-Work.
+        :param chain: Объект Chain для сохранения принятых блоков (необязательно).
+        :param mempool: Пул транзакций (по умолчанию создаётся новый Mempool).
+        :param workers: Число процессов проверки (по умолчанию — число ядер).
+        :param batch_size: Максимум транзакций в одной пакетной проверке подписей.
+        :param max_pending: Максимум пакетов транзакций в проверке одновременно.
+        :param seen_cache_size: Сколько последних транзакций и блоков помнить для отсева повторов.
+        :param peer_queue_size: Максимум кадров в очереди отправки одному соседу.
+        :param tx_queue_size: Максимум транзакций, ожидающих проверки.
+        :param block_queue_size: Максимум блоков, ожидающих проверки.
+        """
+        if (difficulty_bits is None) == (target is None):
+            raise ValueError("Нужно указать ровно одно из: difficulty_bits или target")
+        self.host = host
+        self.port = port
+        self.target = difficulty_to_target(difficulty_bits) if target is None else target
+        self.chain = chain
+        self.mempool = mempool if mempool is not None else Mempool()
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.max_pending = max_pending or self.workers * 2
+        self.peer_queue_size = peer_queue_size
+        self.tx_queue_size = tx_queue_size
+        self.block_queue_size = block_queue_size
+        self.tip = chain.tip if chain is not None else None
+        self.height = len(chain) if chain is not None else 0
+        self._seen = LRUCache(seen_cache_size)
+        self._peers = set()
+        self._server = None
+        self._executor = None
+        self._tasks = []
+        self._batches = set()
+        self._tx_queue = None
+        self._block_queue = None
+
+    async def start(self):
+        """Открывает порт и запускает обработчики проверки."""
+        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        self._tx_queue = asyncio.Queue(self.tx_queue_size)
+        self._block_queue = asyncio.Queue(self.block_queue_size)
+        self._server = await asyncio.start_server(self._on_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._tasks = [asyncio.create_task(self._tx_worker()), asyncio.create_task(self._block_worker())]
+
+    async def close(self):
+        """Закрывает соединения, сервер и пул процессов."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for peer in list(self._peers):
+            self._drop_peer(peer)
+        tasks = self._tasks + list(self._batches)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._executor is not None:
+            # shutdown ждёт завершения процессов, поэтому вызывается вне цикла событий
+            await asyncio.to_thread(self._executor.shutdown, cancel_futures=True)
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def connect(self, host, port):
+        """
+        Подключается к соседнему узлу.
+
+        :param host: Адрес узла.
+        :param port: Порт узла.
+        """
+        reader, writer = await asyncio.open_connection(host, port)
+        self._add_peer(reader, writer)
+
+    async def _on_connection(self, reader, writer):
+        self._add_peer(reader, writer)
+
+    def _add_peer(self, reader, writer):
+        peer = _Peer(reader, writer, self.peer_queue_size)
+        self._peers.add(peer)
+        peer.tasks = [asyncio.create_task(peer.sender()), asyncio.create_task(self._receive(peer))]
+
+    def _drop_peer(self, peer):
+        if peer in self._peers:
+            self._peers.discard(peer)
+            peer.writer.close()
+            for task in peer.tasks:
+                if task is not asyncio.current_task():
+                    task.cancel()
+
+    @property
+    def peers(self):
+        """Адреса подключённых соседей."""
+        return [peer.address for peer in self._peers]
+
+    async def _receive(self, peer):
+        """Читает кадры соседа; при ошибке протокола соединение закрывается."""
+        try:
+            while True:
+                msg_type, payload = await read_frame(peer.reader)
+                if msg_type == MSG_TX:
+                    await self._on_transaction(payload, peer)
+                elif msg_type == MSG_BLOCK:
+                    await self._on_block(payload, peer)
+                else:
+                    raise ValueError(f"Неизвестный тип сообщения: {msg_type}")
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError, struct.error):
+            pass
+        finally:
+            self._drop_peer(peer)
+
+    async def _on_transaction(self, payload, source, result=None):
+        """
+        Отсеивает повтор по байтам сообщения и ставит транзакцию в очередь проверки.
+
+        Если очередь заполнена, ожидает места в ней (и не читает следующие кадры соседа).
+        """
+        transaction = decode_transaction(payload)
+        key = (MSG_TX, inventory_id(payload))
+        if key in self._seen:
+            if result is not None:
+                result.set_result(False)
+            return
+        self._seen.put(key, True)
+        await self._tx_queue.put((transaction, payload, source, result))
+
+    async def _on_block(self, payload, source, result=None):
+        """
+        Отсеивает повтор и ставит блок в очередь проверки.
+
+        Повтором считается уже принятый заголовок или те же данные сообщения,
+        что уже в очереди или отвергнуты. Заголовок запоминается только после
+        принятия блока: копия с тем же заголовком и чужими транзакциями не
+        закрывает дорогу настоящему блоку. Запись блока разбирается и хэшируется
+        уже в пуле процессов (_check_block_payload).
+        """
+        header = BlockHeader.from_buffer(payload)
+        payload_key = (MSG_BLOCK, inventory_id(payload))
+        if (MSG_BLOCK, bytes(header)) in self._seen or payload_key in self._seen:
+            if result is not None:
+                result.set_result(False)
+            return
+        self._seen.put(payload_key, True)
+        await self._block_queue.put((header, payload_key, payload, source, result))
+
+    async def submit_transaction(self, tx, fee=0):
+        """
+        Принимает транзакцию от локального клиента и рассылает её соседям, если она новая и корректна.
+
+        :param tx: Транзакция (Transaction).
+        :param fee: Комиссия.
+        :return: True, если транзакция добавлена в пул.
+        """
+        result = asyncio.get_running_loop().create_future()
+        await self._on_transaction(encode_transaction(tx, fee), None, result)
+        return await result
+
+    async def submit_block(self, header, transactions=()):
+        """
+        Принимает блок от локального майнера и рассылает его соседям, если он новый и корректен.
+
+        :param header: Заголовок блока (BlockHeader, байты или hex-строка).
+        :param transactions: Последовательность Transaction.
+        :return: True, если блок принят как новая вершина.
+        """
+        result = asyncio.get_running_loop().create_future()
+        await self._on_block(encode_block(header, transactions), None, result)
+        return await result
+
+    async def _tx_worker(self):
+        """
+        Собирает пришедшие транзакции в пакеты и отправляет их на проверку.
+
+        Пока пакет проверяется в пуле процессов, следующий уже собирается;
+        одновременно в проверке не больше max_pending пакетов.
+        """
+        slots = asyncio.Semaphore(self.max_pending)
+        while True:
+            batch = [await self._tx_queue.get()]
+            while len(batch) < self.batch_size and not self._tx_queue.empty():
+                batch.append(self._tx_queue.get_nowait())
+            await slots.acquire()
+            task = asyncio.create_task(self._admit_transactions(batch, slots))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _admit_transactions(self, batch, slots):
+        """
+        Проверяет пакет в пуле процессов и добавляет корректные транзакции в пул.
+
+        Подписи и хэши листьев вычисляются в пуле процессов, а вставка пакета в пул
+        с пересчётом путей дерева Меркла выполняется в отдельном потоке.
+        """
+        loop = asyncio.get_running_loop()
+        added = [False] * len(batch)
+        try:
+            verdicts, leaves = await loop.run_in_executor(self._executor, _verify_transactions,
+                                                          [tx for (tx, _), _, _, _ in batch])
+            valid = [i for i, ok in enumerate(verdicts) if ok]
+            flags = await asyncio.to_thread(self.mempool.add_many, [batch[i][0] for i in valid],
+                                            verified=True, leaves=[leaves[i] for i in valid])
+            for i, flag in zip(valid, flags):
+                added[i] = flag
+        except Exception:
+            # Пул процессов сломан или пул транзакций выбросил ошибку: пакет не принимается,
+            # но его транзакции можно будет прислать снова
+            _log.exception("Не удалось проверить пакет из %d транзакций", len(batch))
+            for _, payload, _, _ in batch:
+                self._seen.pop((MSG_TX, inventory_id(payload)))
+        finally:
+            slots.release()
+            for (_, payload, source, result), flag in zip(batch, added):
+                if flag:
+                    self._relay(encode_frame(MSG_TX, payload), source)
+                if result is not None and not result.done():
+                    result.set_result(flag)
+
+    async def _block_worker(self):
+        """Проверяет блоки по одному в порядке поступления, чтобы вершина менялась последовательно."""
+        loop = asyncio.get_running_loop()
+        while True:
+            header, payload_key, payload, source, result = await self._block_queue.get()
+            accepted = False
+            try:
+                if self.tip is None or header.prev_hash == self.tip:
+                    block, reason, leaves = await loop.run_in_executor(self._executor, _check_block_payload,
+                                                                       payload, self.target)
+                    accepted = reason is None and await asyncio.to_thread(self._accept_block, block, leaves)
+                else:
+                    # Блок не продолжает вершину (например, пришёл раньше родителя):
+                    # его можно будет принять позже, поэтому повтором он не считается
+                    self._seen.pop(payload_key)
+            except Exception:
+                # Ошибка пула процессов или записи в цепочку не останавливает обработчик:
+                # блок не принят, но его можно будет прислать снова
+                _log.exception("Не удалось проверить блок %s", payload_key[1].hex())
+                self._seen.pop(payload_key)
+            finally:
+                if result is not None and not result.done():
+                    result.set_result(accepted)
+            if accepted:
+                self._seen.put((MSG_BLOCK, bytes(header)), True)
+                self._relay(encode_frame(MSG_BLOCK, payload), source)
+
+    def _accept_block(self, block, leaves):
+        """
+        Делает проверенный блок вершиной и убирает его транзакции из пула.
+
+        Выполняется в отдельном потоке; вершину меняет только _block_worker,
+        который ждёт завершения этого вызова.
+        """
+        if self.tip is not None and block.header.prev_hash != self.tip:
+            return False
+        if self.chain is not None:
+            self.chain.append(block.header, block.transactions)
+        self.mempool.remove(block.transactions, leaves)
+        self.tip = block.hash
+        self.height += 1
+        return True
+
+    def _relay(self, frame, source):
+        for peer in list(self._peers):
+            if peer is not source:
+                peer.send(frame)
+
+
+async def _serve(args):
+    node = Node(args.host, args.port, difficulty_bits=args.bits, workers=args.workers)
+    async with node:
+        for address in args.peer:
+            host, port = address.rsplit(':', 1)
+            await node.connect(host, int(port))
+        print(f"Узел слушает {node.host}:{node.port}")
+        await asyncio.Event().wait()
+
+
+async def _wait_for(condition, timeout=30.0):
+    """Ждёт, пока condition() не станет истинным (не дольше timeout секунд)."""
+    async with asyncio.timeout(timeout):
+        while not condition():
+            await asyncio.sleep(0.01)
+
+
+async def _watch_loop(stalls, interval=0.005):
+    """Записывает в stalls, на сколько секунд цикл событий опаздывает разбудить задачу."""
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        stalls.append(loop.time() - started - interval)
+
+
+async def _selftest(args):
+    """
+    Самопроверка трёх узлов на localhost, соединённых треугольником.
+
+    Транзакции, отправленные одному узлу, должны дойти до пулов всех узлов,
+    повтор и транзакция с чужой подписью — отвергаться, а блок из шаблона —
+    стать вершиной всех узлов, сохраниться в цепочке и очистить пулы.
+    Печатает пропускную способность и наибольшую задержку цикла событий.
+    """
+    import tempfile
+
+    from chain_storage import Chain
+    from Schnorr_sign import SchnorrSignature
+
+    signer = SchnorrSignature(os.urandom(16).hex())
+    transactions = []
+    for _ in range(args.count):
+        data = os.urandom(200)
+        transactions.append(Transaction(data, signer.sign(data), signer.P))
+
+    with tempfile.TemporaryDirectory() as path, Chain(path) as chain:
+        nodes = [Node(difficulty_bits=args.bits, workers=args.workers),
+                 Node(difficulty_bits=args.bits, workers=args.workers, chain=chain),
+                 Node(difficulty_bits=args.bits, workers=args.workers)]
+        stalls = []
+        watcher = asyncio.create_task(_watch_loop(stalls))
+        try:
+            for node in nodes:
+                await node.start()
+            a, b, c = nodes
+            await b.connect(a.host, a.port)
+            await c.connect(b.host, b.port)
+            await c.connect(a.host, a.port)
+
+            started = time.perf_counter()
+            added = await asyncio.gather(*(a.submit_transaction(tx, fee=i % 7) for i, tx in enumerate(transactions)))
+            assert all(added), f"отвергнуто {added.count(False)} корректных транзакций"
+            await _wait_for(lambda: all(len(node.mempool) == len(transactions) for node in nodes))
+            elapsed = time.perf_counter() - started
+
+            assert not await a.submit_transaction(transactions[0]), "повтор принят"
+            forged = Transaction(os.urandom(200), transactions[1].signature, signer.P)
+            assert not await c.submit_transaction(forged), "принята транзакция с чужой подписью"
+
+            template = a.mempool.block_template()
+            header = BlockHeader(0xf0000000, bytes(32), template.merkle_root, int(time.time()))
+            mined = await asyncio.to_thread(Miner(difficulty_bits=args.bits, workers=1).mine, header.prefix())
+            # Копия с тем же заголовком и неполным списком транзакций не должна мешать настоящему блоку
+            assert not await a.submit_block(mined.header, template.transactions[1:]), "принят блок с чужим корнем"
+            assert await c.submit_block(mined.header, template.transactions), "корректный блок отвергнут"
+            await _wait_for(lambda: all(node.height == 1 and not len(node.mempool) for node in nodes))
+            assert len(chain) == 1 and chain.tip == a.tip, "блок не сохранён в цепочке"
+            assert not await a.submit_block(mined.header, template.transactions), "повтор блока принят"
+        finally:
+            watcher.cancel()
+            for node in nodes:
+                await node.close()
+
+    print(f"Самопроверка пройдена: {len(transactions)} транзакций за {elapsed:.2f} с "
+          f"({len(transactions) / elapsed:.0f} транзакций/с), "
+          f"наибольшая задержка цикла событий {max(stalls) * 1000:.1f} мс")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Узел сети: приём и рассылка транзакций и блоков")
+    parser.add_argument('--host', default='127.0.0.1', help="Адрес для входящих соединений")
+    parser.add_argument('--port', type=int, default=0, help="Порт (0 — любой свободный)")
+    parser.add_argument('--peer', action='append', default=[], help="Сосед в виде host:port (можно несколько)")
+    parser.add_argument('--bits', type=int, default=5, help="Сложность Proof-of-Work в битах")
+    parser.add_argument('--workers', type=int, help="Число процессов проверки")
+    parser.add_argument('--selftest', action='store_true', help="Запустить три узла на localhost и проверить рассылку")
+    parser.add_argument('--count', type=int, default=400, help="Число транзакций в самопроверке")
+    args = parser.parse_args()
+    try:
+        asyncio.run(_selftest(args) if args.selftest else _serve(args))
+    except KeyboardInterrupt:
+        pass
@@ -1,41 +1,101 @@
-from hash_Streebog import streebog_hash  #
+from hash_Streebog import streebog_digest, streebog_digest_many
 
 
-def pseudorandom_generator(seed: str, count: int, return_decimal: bool = False):
-    """
-    Генератор псевдослучайных чисел на основе хэш-функции ГОСТ Р 34.11-2018 (256 бит).
+class PseudorandomGenerator:
+    def __init__(self, seed: str, return_decimal: bool = False):
+        """
+        Потоковый генератор псевдослучайных чисел hi = H(h0 ∥ i) в режиме счётчика.
 
-    :param seed: Строка-сид (имя и фамилия студента).
-    :param count: Количество чисел, которые нужно сгенерировать.
-    :param return_decimal: Если True — вернуть числа в десятичной системе, иначе hex.
-    :return: Список псевдослучайных чисел.
-    """
-    # Преобразуем seed в байты, затем в hex-строку, затем дополняем до 512 бит (64 байта = 128 hex символов)
-    seed_bytes = seed.encode('utf-8')[:64]  # ограничение до 64 байт
-    seed_bytes += b'\x00' * (64 - len(seed_bytes))  # дополнение до 64 байт
-    seed_hex = seed_bytes.hex()
+        h0 = H(seed) вычисляется один раз, а каждое значение зависит только от своего
+        номера, поэтому next() стоит один хэш, а seek() не требует пересчёта.
+
+        :param seed: Строка-сид (имя и фамилия студента).
+        :param return_decimal: Если True — возвращать числа в десятичной системе, иначе hex.
+        """
+        # Преобразуем seed в байты и дополняем до 512 бит (64 байта)
+        seed_bytes = seed.encode('utf-8')[:64]  # ограничение до 64 байт
+        seed_bytes += b'\x00' * (64 - len(seed_bytes))  # дополнение до 64 байт
+
+        # h0 = H(seed)
+        self.h0 = streebog_digest(seed_bytes)
+        self.return_decimal = return_decimal
+        self._counter = 0
+
+    def _input(self, i: int) -> bytes:
+        # h0 ∥ i — объединение двух 256-битных значений в одно 512-битное,
+        # где i записано как 32-байтовое число
+        return self.h0 + i.to_bytes(32, 'big')
+
+    def _convert(self, value: bytes):
+        return int.from_bytes(value, 'big') if self.return_decimal else value.hex()
+
+    def __iter__(self):
+        return self
 
-    # h0 = H(seed)
-    h0 = streebog_hash(seed_hex, is_hex=True)
+    def __next__(self):
+        return self.next()
 
-    results = []
-    for i in range(1, count + 1):
-        # Преобразуем i в 256-битную hex-строку (64 hex символа)
-        i_hex = format(i, '064x')
+    def next(self):
+        """
+        :return: Следующее псевдослучайное число.
+        """
+        return self._convert(self.next_bytes())
 
-        # h0 ∥ i — объединение двух 256-битных hex-строк в одну 512-битную hex-строку
-        combined_input = h0 + i_hex
+    def next_bytes(self) -> bytes:
+        """
+        :return: Следующее псевдослучайное значение в виде 32 байт (старший байт первым).
+        """
+        self._counter += 1
+        return streebog_digest(self._input(self._counter))
 
-        # hi = H(h0 ∥ i)
-        hi = streebog_hash(combined_input, is_hex=True)
+    def take(self, count: int) -> list:
+        """
+        Возвращает следующие count чисел, хэшируя их одним пакетом.
 
-        if return_decimal:
-            hi = int(hi, 16)
+        :param count: Количество чисел.
+        :return: Список псевдослучайных чисел.
+        """
+        return [self._convert(value) for value in self.take_bytes(count)]
 
-        results.append(hi)
+    def take_bytes(self, count: int) -> list:
+        """
+        Возвращает следующие count значений в виде 32-байтовых строк.
 
-    return results
+        :param count: Количество значений.
+        :return: Список значений (bytes).
+        """
+        inputs = [self._input(i) for i in range(self._counter + 1, self._counter + count + 1)]
+        self._counter += count
+        # hi = H(h0 ∥ i) — все входы одной длины, поэтому хэшируются одним пакетом
+        return streebog_digest_many(inputs, cached=False)
 
+    def tell(self) -> int:
+        """
+        :return: Число уже выданных значений (снимок счётчика для seek).
+        """
+        return self._counter
+
+    def seek(self, position: int):
+        """
+        Переставляет генератор: следующим будет значение с номером position + 1.
+
+        :param position: Число значений, которые считаются выданными (например, результат tell()).
+        """
+        if position < 0:
+            raise ValueError("Позиция генератора не может быть отрицательной")
+        self._counter = position
+
+
+def pseudorandom_generator(seed: str, count: int, return_decimal: bool = False):
+    """
+    Генератор псевдослучайных чисел на основе хэш-функции ГОСТ Р 34.11-2018 (256 бит).
+
+    :param seed: Строка-сид (имя и фамилия студента).
+    :param count: Количество чисел, которые нужно сгенерировать.
+    :param return_decimal: Если True — вернуть числа в десятичной системе, иначе hex.
+    :return: Список псевдослучайных чисел.
+    """
+    return PseudorandomGenerator(seed, return_decimal).take(count)
 
 
 if __name__ == "__main__":